@@ -5,8 +5,8 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from flask import Flask, request, jsonify, render_template_string, send_from_directory, redirect, url_for, session
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from static_data import get_zone_from_vendor_zip, get_shipping_cost
-from google_sheets import get_item_names, get_item_weight, add_item_to_sheet, remove_item_from_sheet, save_shipping_history, get_shipping_history, delete_item_shipping_history
-from google_sheets import get_vendors_data, add_vendor_to_sheet
+from google_sheets import build_shipping_history_row
+from storage import get_backend
 import math
 
 app = Flask(__name__)
@@ -14,6 +14,10 @@ app.secret_key = 'your-secret-key-change-this-in-production'  # Change this in p
 
 OFFSET_PERCENT = 0.14  # 14% markup
 
+# Items, vendors and history storage (Google Sheets unless STORAGE_BACKEND says otherwise)
+storage = get_backend()
+storage.start()
+
 # Initialize Flask-Login
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -64,7 +68,7 @@ def index():
 @app.route("/api/item_names", methods=["GET"])
 def api_item_names():
     try:
-        item_names = get_item_names()
+        item_names = storage.get_item_names()
         return jsonify({"items": item_names})
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -74,7 +78,7 @@ def api_item_weight():
     data = request.json or {}
     name = data.get("name", "").lower().strip()
     try:
-        weight = get_item_weight(name)
+        weight = storage.get_item_weight(name)
         if weight is None:
             return jsonify({"error": f"Weight not found for '{name}'"}), 400
         return jsonify({"weight": weight})
@@ -89,7 +93,7 @@ def api_add_item():
     if not name or weight is None:
         return jsonify({"error": "Name and weight are required."}), 400
     try:
-        add_item_to_sheet(name, weight)
+        storage.add_item(name, weight)
         return jsonify({"success": True})
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -101,7 +105,7 @@ def api_remove_item():
     if not name:
         return jsonify({"error": "Name is required."}), 400
     try:
-        success = remove_item_from_sheet(name)
+        success = storage.remove_item(name)
         if not success:
             return jsonify({"error": "Item not found."}), 400
         return jsonify({"success": True})
@@ -144,6 +148,7 @@ def api_calculate():
             "offset_shipping_cost": offset_shipping_cost,
             "items": []
         }
+        history_rows = []
         for item in items:
             weight = float(item.get("weight") or 0.0)
             quantity = int(item.get("quantity") or 0)
@@ -157,8 +162,8 @@ def api_calculate():
             retail_50 = (cost + offset_cost_per_unit) / 0.5 if quantity else 0.0
             retail_55 = (cost + offset_cost_per_unit) / 0.45 if quantity else 0.0
             retail_60 = (cost + offset_cost_per_unit) / 0.4 if quantity else 0.0
-            # Append to history (now with vendor, UPS flag, weight used, PO number, and receiving location)
-            save_shipping_history(item["name"], offset_cost_per_unit, offset_cost_per_unit, quantity, vendor, is_ups='Yes', weight_used=weight, po_number=po_number, receiving_location=receiving_location)
+            # Collect history row (vendor, UPS flag, weight used, PO number, and receiving location); saved once below
+            history_rows.append(build_shipping_history_row(item["name"], offset_cost_per_unit, offset_cost_per_unit, quantity, vendor, is_ups='Yes', weight_used=weight, po_number=po_number, receiving_location=receiving_location))
             item_result = {
                 "name": item["name"],
                 "quantity": int(quantity),
@@ -171,6 +176,10 @@ def api_calculate():
                 "vendor": vendor
             }
             result["items"].append(item_result)
+        # Save the whole PO at once (spooled for one background append on Sheets); the quote is still returned if this failed
+        result["history_saved"] = storage.save_history_rows(history_rows)
+        if not result["history_saved"]:
+            result["history_error"] = f"Failed to save {len(history_rows)} item(s) to shipping history"
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -178,43 +187,8 @@ def api_calculate():
 @app.route("/api/item_shipping_averages", methods=["GET"])
 def api_item_shipping_averages():
     try:
-        history = get_shipping_history()
-        if not history:
-            return jsonify({"items": []})
-        # Group by (item name, vendor) and calculate weighted averages
-        item_averages = {}
-        for record in history:
-            item_name = record['Item Name']
-            vendor = record.get('Vendor', '')
-            key = (item_name, vendor)
-            quantity = record.get('Quantity', 1)
-            try:
-                quantity = float(quantity)
-            except Exception:
-                quantity = 1
-            offset_cost = record['Per-Unit Shipping Cost (Offset)']
-            is_ups = record.get('UPS', 'No') # Get UPS value
-            if key not in item_averages:
-                item_averages[key] = {
-                    'offset_cost_sum': 0.0,
-                    'quantity_sum': 0.0,
-                    'UPS': is_ups # Store UPS value
-                }
-            item_averages[key]['offset_cost_sum'] += float(offset_cost) * quantity
-            item_averages[key]['quantity_sum'] += quantity
-        # Calculate weighted averages
-        items = []
-        for (item_name, vendor), data in item_averages.items():
-            if data['quantity_sum'] > 0:
-                avg_offset_cost = data['offset_cost_sum'] / data['quantity_sum']
-            else:
-                avg_offset_cost = 0.0
-            items.append({
-                "name": item_name,
-                "vendor": vendor,
-                "avg_per_unit_shipping_offset": avg_offset_cost,
-                "UPS": data['UPS'] # Include UPS value
-            })
+        # Served from running per-(item, vendor) sums kept up to date as history syncs
+        items = storage.get_item_shipping_averages()
         return jsonify({"items": items})
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -227,7 +201,7 @@ def api_delete_item_shipping_history():
     if not name:
         return jsonify({"error": "Name is required."}), 400
     try:
-        success = delete_item_shipping_history(name, vendor) # Pass vendor
+        success = storage.delete_item_history(name, vendor) # Pass vendor
         return jsonify({"success": success})
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -249,7 +223,8 @@ def api_add_non_ups_item():
             return jsonify({"error": "Quantity and freight must be positive."}), 400
         per_unit_cost = freight / quantity
         # Save with per_unit_cost in both actual and offset fields, UPS flag 'No', weight used, and empty receiving location
-        success = save_shipping_history(name, per_unit_cost, per_unit_cost, quantity, vendor, is_ups='No', weight_used=weight_used, receiving_location='')
+        row = build_shipping_history_row(name, per_unit_cost, per_unit_cost, quantity, vendor, is_ups='No', weight_used=weight_used, receiving_location='')
+        success = storage.save_history_rows([row])
         if not success:
             return jsonify({"error": "Failed to save to shipping history"}), 500
         return jsonify({"success": True})
@@ -259,19 +234,14 @@ def api_add_non_ups_item():
 
 @app.route("/api/items_with_weights", methods=["GET"])
 def api_items_with_weights():
-    from google_sheets import get_items_with_weights
-    items = get_items_with_weights()
+    items = storage.get_items_with_weights()
     return jsonify({"items": items})
 
 @app.route("/api/item_names_by_vendor", methods=["POST"])
 def api_item_names_by_vendor():
     data = request.json or {}
     vendor = data.get("vendor", "").strip()
-    from google_sheets import get_shipping_history
-    history = get_shipping_history()
-    items = sorted(list(set(
-        record['Item Name'] for record in history if record.get('Vendor', '').strip() == vendor and record.get('Item Name')
-    )))
+    items = storage.get_item_names_by_vendor(vendor)
     return jsonify({"items": items})
 
 @app.route('/all_gsf_classic_black_punched_out_400x.webp')
@@ -283,15 +253,14 @@ def api_last_weight_used():
     data = request.json or {}
     item_name = data.get("item_name", "").strip()
     vendor = data.get("vendor", "").strip()
-    from google_sheets import get_last_weight_used
-    weight = get_last_weight_used(item_name, vendor)
+    weight = storage.get_last_weight_used(item_name, vendor)
     return jsonify({"weight": weight})
 
 # New API endpoint for vendor list
 @app.route("/api/vendors", methods=["GET"])
 def api_vendors():
     try:
-        vendors = get_vendors_data()
+        vendors = storage.get_vendors()
         return jsonify({"vendors": vendors})
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -305,13 +274,24 @@ def api_add_vendor():
     if not name or not zip_code:
         return jsonify({"error": "Vendor name and ZIP code are required."}), 400
     try:
-        add_vendor_to_sheet(name, zip_code)
+        storage.add_vendor(name, zip_code)
         return jsonify({"success": True})
     except ValueError as ve:
         return jsonify({"error": str(ve)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Readiness probe: 503 until the storage backend has finished warming its caches
+@app.route("/api/ready", methods=["GET"])
+def api_ready():
+    ready = storage.is_ready()
+    return jsonify({"ready": ready}), 200 if ready else 503
+
+# Diagnostics for the storage backend (client, cache and sync counters on Sheets)
+@app.route("/api/sheets_stats", methods=["GET"])
+def api_sheets_stats():
+    return jsonify(storage.get_stats())
+
 HTML_PAGE = '''
 <!DOCTYPE html>
 <html lang="en">
@@ -1327,6 +1307,9 @@ $("#shipping-form").submit(function(e) {
                 html += `</div>`;
             });
             $("#result-box").html(html).show();
+            if (data.history_saved === false) {
+                alert("Warning: " + (data.history_error || "Failed to save shipping history."));
+            }
             loadAveragesPanel(); // update averages after calculation
             // Clear items after calculation (robust)
             while (items.length > 0) { items.pop(); }
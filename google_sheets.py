@@ -1,64 +1,538 @@
 import gspread
+import requests
 from google.oauth2.service_account import Credentials
 import os
 import json
-from datetime import datetime
+import threading
+import time
+from bisect import insort
+from datetime import datetime, timedelta, timezone
+from gspread.utils import DateTimeOption, ValueRenderOption, numericise, rowcol_to_a1, a1_range_to_grid_range
+from history_store import HISTORY_COLUMNS, HistoryStore, history_record_from_row, last_weight_used, item_names_by_vendor, summary_rows, timestamp_epoch
+from history_writer import HistoryWriter
+from rate_limiter import RateLimiter
+from sheets_mirror import SheetsMirror
 
-def get_google_sheets_client():
+# Scope for Google Sheets API
+SCOPES = ['https://spreadsheets.google.com/feeds',
+          'https://www.googleapis.com/auth/drive']
+
+# Point gspread at another Sheets API host (e.g. sheets_standin.py for load tests); no OAuth is done then
+SHEETS_API_BASE_URL = os.environ.get('SHEETS_API_BASE_URL')
+_SHEETS_API_ORIGIN = 'https://sheets.googleapis.com'
+
+_client = None
+_client_lock = threading.Lock()
+_client_stats = {
+    'clients_created': 0,
+    'token_refreshes': 0,
+    'last_token_refresh': None,
+    'worksheet_opens': 0,
+}
+
+
+class _CountingCredentials(Credentials):
     """
-    Setup and return Google Sheets client using service account credentials.
+    Service account credentials that record every OAuth token refresh in the client stats.
+    """
+    def refresh(self, request):
+        super().refresh(request)
+        with _client_lock:
+            _client_stats['token_refreshes'] += 1
+            _client_stats['last_token_refresh'] = datetime.now().isoformat(sep=' ', timespec='seconds')
+
+
+def _load_credentials_info():
+    """
+    Load the service account credentials dict from the environment or google-credentials.json.
     """
     # Try to get credentials from environment variable first
     creds_json = os.environ.get('GOOGLE_SHEETS_CREDENTIALS_JSON')
     
     if creds_json:
         # Use environment variable
-        creds_dict = json.loads(creds_json)
-    else:
-        # Try to load from google-credentials.json file
-        creds_file_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'google-credentials.json')
-        if os.path.exists(creds_file_path):
-            with open(creds_file_path, 'r') as f:
-                creds_dict = json.load(f)
+        return json.loads(creds_json)
+    # Try to load from google-credentials.json file
+    creds_file_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'google-credentials.json')
+    if os.path.exists(creds_file_path):
+        with open(creds_file_path, 'r') as f:
+            return json.load(f)
+    raise ValueError("No Google credentials found. Please set GOOGLE_SHEETS_CREDENTIALS_JSON environment variable or ensure google-credentials.json exists.")
+
+# Client-side budgets matching the Sheets per-user quotas (requests per minute)
+SHEETS_READ_QUOTA_PER_MINUTE = float(os.environ.get('SHEETS_READ_QUOTA_PER_MINUTE', 60))
+SHEETS_WRITE_QUOTA_PER_MINUTE = float(os.environ.get('SHEETS_WRITE_QUOTA_PER_MINUTE', 60))
+SHEETS_RATE_BURST = float(os.environ.get('SHEETS_RATE_BURST', 10))
+SHEETS_MAX_RETRIES = int(os.environ.get('SHEETS_MAX_RETRIES', 5))
+
+_rate_limiter = RateLimiter(SHEETS_READ_QUOTA_PER_MINUTE, SHEETS_WRITE_QUOTA_PER_MINUTE,
+                            burst=SHEETS_RATE_BURST, max_retries=SHEETS_MAX_RETRIES)
+
+def _api_error_status(error):
+    """
+    HTTP status of a failed gspread call, or None if it never got a response.
+    """
+    if isinstance(error, gspread.exceptions.APIError):
+        return getattr(error.response, 'status_code', None)
+    return None
+
+def _is_permanent_write_error(error):
+    """
+    True if the sheet rejected the rows themselves (400 INVALID_ARGUMENT), so retrying them won't help.
+    Auth, permission and not-found errors (401/403/404) and timeouts are fixed outside the app,
+    after which the same rows go through, so those are retried like any other failure.
+    """
+    return _api_error_status(error) == 400
+
+def _retry_after(error):
+    try:
+        return float(error.response.headers.get('Retry-After'))
+    except Exception:
+        return None
+
+class _RateLimitedHTTPClient(gspread.HTTPClient):
+    """
+    gspread HTTP client that sends every API call through the shared rate limiter.
+    GETs spend the read budget, everything else the write budget. Writes (appends,
+    index-based row deletes) are not safe to repeat, so they are retried on 429 only.
+    """
+    def request(self, method, endpoint, *args, **kwargs):
+        is_read = method.lower() == 'get'
+        send = super().request
+        return _rate_limiter.call('read' if is_read else 'write', lambda: send(method, endpoint, *args, **kwargs),
+                                  _api_error_status, _retry_after, idempotent=is_read)
+
+class _BaseURLSession(requests.Session):
+    """
+    Session that sends Sheets API calls to base_url instead of sheets.googleapis.com.
+    """
+    def __init__(self, base_url):
+        super().__init__()
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, url, *args, **kwargs):
+        if url.startswith(_SHEETS_API_ORIGIN):
+            url = self.base_url + url[len(_SHEETS_API_ORIGIN):]
+        return super().request(method, url, *args, **kwargs)
+
+def get_google_sheets_client():
+    """
+    Return the process-wide Google Sheets client, creating it on first use.
+    The OAuth token is reused until it nears expiry and is then refreshed in a
+    background thread, so requests only block on auth for the very first call.
+    """
+    global _client
+    client = _client
+    if client is not None:
+        return client
+    with _client_lock:
+        if _client is None and SHEETS_API_BASE_URL:
+            _client = gspread.Client(None, session=_BaseURLSession(SHEETS_API_BASE_URL), http_client=_RateLimitedHTTPClient)
+            _client_stats['clients_created'] += 1
+        elif _client is None:
+            credentials = _CountingCredentials.from_service_account_info(_load_credentials_info(), scopes=SCOPES)
+            # Refresh stale tokens in the background instead of on the request path
+            credentials.with_non_blocking_refresh()
+            _client = gspread.authorize(credentials, http_client=_RateLimitedHTTPClient)
+            _client_stats['clients_created'] += 1
+        return _client
+
+def reset_google_sheets_client():
+    """
+    Drop the cached client so the next call re-reads credentials (e.g. after rotating keys).
+    """
+    global _client
+    with _client_lock:
+        _client = None
+    # Worksheet handles are bound to the old client
+    invalidate_worksheet()
+
+def get_client_stats():
+    """
+    Return counters for client creation, OAuth token refreshes, worksheet opens and rate limiting.
+    """
+    with _client_lock:
+        stats = dict(_client_stats)
+        credentials = getattr(_client.http_client, 'auth', None) if _client is not None else None
+    stats['rate_limits'] = _rate_limiter.get_stats()
+    if credentials is not None and credentials.expiry is not None:
+        stats['token_expiry'] = credentials.expiry.isoformat(sep=' ', timespec='seconds')
+    return stats
+
+def get_cache_stats():
+    """
+    Return hit/miss counters and sizes for the in-process sheet caches and the history writer.
+    """
+    with _items_cache_lock:
+        items = _items_cache['items']
+        stats = {
+            'items': {
+                'hits': _items_cache['hits'],
+                'stale_hits': _items_cache['stale_hits'],
+                'misses': _items_cache['misses'],
+                'size': len(items) if items is not None else None,
+                'age_seconds': round(time.monotonic() - _items_cache['loaded_at'], 1) if items is not None else None,
+            },
+        }
+    with _vendors_cache_lock:
+        vendors = _vendors_cache['vendors']
+        stats['vendors'] = {
+            'hits': _vendors_cache['hits'],
+            'stale_hits': _vendors_cache['stale_hits'],
+            'misses': _vendors_cache['misses'],
+            'size': len(vendors) if vendors is not None else None,
+            'age_seconds': round(time.monotonic() - _vendors_cache['loaded_at'], 1) if vendors is not None else None,
+        }
+    with _history_lock:
+        synced_at = _history_stats['synced_at']
+        stats['history'] = {key: value for key, value in _history_stats.items() if key != 'synced_at'}
+        stats['history']['rows'] = len(_history_store) if _history_store.loaded else None
+        stats['history']['age_seconds'] = round(time.monotonic() - synced_at, 1) if synced_at is not None else None
+    with _background_lock:
+        stats['background_refreshes'] = dict(_background_stats, running=len(_background_refreshes))
+    if _history_writer is not None:
+        stats['history_writer'] = _history_writer.get_stats()
+    mirror = get_mirror()
+    if mirror is not None:
+        stats['mirror'] = dict(_mirror_stats, synced=mirror.synced, history_rows=mirror.history_count())
+    stats['single_flight'] = _single_flight.get_stats()
+    stats['warmup'] = get_warmup_stats()
+    with _archive_lock:
+        stats['archive'] = dict(_archive_stats)
+    return stats
+
+class _SingleFlight:
+    """
+    Coalesces concurrent calls per key: the first caller runs the function and
+    callers arriving while it is in flight wait for and share its result (or exception).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {'calls': 0, 'shared': 0}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+                self.stats['calls'] += 1
+            else:
+                self.stats['shared'] += 1
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+        try:
+            call['result'] = fn()
+            return call['result']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['done'].set()
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, in_flight=len(self._calls))
+
+# Concurrent reads of the same sheet share one API call
+_single_flight = _SingleFlight()
+
+# Cached sheet data past its TTL is still served (while one background refresh runs)
+# until it is this many seconds old; only then does a request wait for Google
+SHEETS_MAX_STALENESS = float(os.environ.get('SHEETS_MAX_STALENESS', 3600))
+
+_background_refreshes = set()
+_background_lock = threading.Lock()
+_background_stats = {'started': 0, 'failures': 0, 'last_error': None}
+
+def _cache_state(loaded_at, ttl):
+    """
+    Classify a cache entry loaded at loaded_at (monotonic, None if empty) as
+    'fresh', 'stale' (serve it and revalidate in the background) or 'expired'.
+    """
+    if loaded_at is None:
+        return 'expired'
+    age = time.monotonic() - loaded_at
+    if age < ttl:
+        return 'fresh'
+    if age < SHEETS_MAX_STALENESS:
+        return 'stale'
+    return 'expired'
+
+def _refresh_in_background(key, refresh):
+    """
+    Run refresh() on a background thread through the single-flight layer, unless
+    a background refresh for key is already running.
+    """
+    with _background_lock:
+        if key in _background_refreshes:
+            return
+        _background_refreshes.add(key)
+        _background_stats['started'] += 1
+
+    def run():
+        try:
+            _single_flight.do(key, refresh)
+        except Exception as e:
+            with _background_lock:
+                _background_stats['failures'] += 1
+                _background_stats['last_error'] = str(e)
+            print(f"Error refreshing {key} in the background: {e}")
+        finally:
+            with _background_lock:
+                _background_refreshes.discard(key)
+
+    threading.Thread(target=run, name=f"refresh-{key}", daemon=True).start()
+
+# Worksheet handles keyed by spreadsheet ID, resolved once and reused
+_worksheets = {}
+_worksheets_lock = threading.Lock()
+
+def get_worksheet(sheet_id):
+    """
+    Return the first worksheet of the given spreadsheet, opening it only on first use.
+    """
+    sheet = _worksheets.get(sheet_id)
+    if sheet is not None:
+        return sheet
+    with _worksheets_lock:
+        sheet = _worksheets.get(sheet_id)
+        if sheet is None:
+            sheet = get_google_sheets_client().open_by_key(sheet_id).sheet1
+            _worksheets[sheet_id] = sheet
+            with _client_lock:
+                _client_stats['worksheet_opens'] += 1
+        return sheet
+
+def invalidate_worksheet(sheet_id=None):
+    """
+    Forget a cached worksheet handle (or all of them) so it is re-resolved on next use.
+    """
+    with _worksheets_lock:
+        if sheet_id is None:
+            _worksheets.clear()
         else:
-            raise ValueError("No Google credentials found. Please set GOOGLE_SHEETS_CREDENTIALS_JSON environment variable or ensure google-credentials.json exists.")
-    
-    # Define scope for Google Sheets API
-    scope = ['https://spreadsheets.google.com/feeds',
-             'https://www.googleapis.com/auth/drive']
+            _worksheets.pop(sheet_id, None)
+
+def _is_stale_handle_error(error):
+    """
+    True if the error means the cached worksheet no longer matches the spreadsheet,
+    e.g. the tab was renamed (ranges no longer parse) or deleted.
+    """
+    if isinstance(error, gspread.exceptions.WorksheetNotFound):
+        return True
+    if isinstance(error, gspread.exceptions.APIError):
+        status = getattr(error.response, 'status_code', None)
+        if status == 404:
+            return True
+        if status == 400 and 'Unable to parse range' in str(error):
+            return True
+    return False
+
+def _with_worksheet(sheet_id, operation):
+    """
+    Run operation(sheet) against the cached worksheet, re-resolving the handle once if it went stale.
+    """
+    try:
+        return operation(get_worksheet(sheet_id))
+    except gspread.exceptions.GSpreadException as e:
+        if not _is_stale_handle_error(e):
+            raise
+        invalidate_worksheet(sheet_id)
+        return operation(get_worksheet(sheet_id))
+
+# Optional local SQLite mirror of the three sheets; reads are served from it once it has synced
+SHEETS_MIRROR_PATH = os.environ.get('SHEETS_MIRROR_PATH')
+SHEETS_MIRROR_SYNC_INTERVAL = float(os.environ.get('SHEETS_MIRROR_SYNC_INTERVAL', 60))
+
+_mirror = None
+_mirror_lock = threading.Lock()
+_mirror_thread = None
+_mirror_stats = {'syncs': 0, 'failures': 0, 'last_sync': None, 'last_error': None}
+
+# Startup warm-up: the items, vendors and history caches are loaded in parallel in the
+# background so the first page load after a restart is served from warm caches
+_warmup_lock = threading.Lock()
+_warmup_thread = None
+_warmup_state = {'ready': False, 'started_at': None, 'seconds': None, 'loaded': [], 'errors': {}}
+
+def get_mirror():
+    """
+    Return the SQLite mirror if SHEETS_MIRROR_PATH is set, opening it on first use.
+    """
+    global _mirror
+    if not SHEETS_MIRROR_PATH:
+        return None
+    with _mirror_lock:
+        if _mirror is None:
+            _mirror = SheetsMirror(SHEETS_MIRROR_PATH)
+        return _mirror
+
+def _mirror_for_reads():
+    """
+    The mirror if reads should be served from it (enabled and synced at least once), else None.
+    """
+    mirror = get_mirror()
+    if mirror is not None and mirror.synced:
+        return mirror
+    return None
+
+# Seconds the in-process items catalog is served before it is re-read from Google
+ITEMS_CACHE_TTL = float(os.environ.get('ITEMS_CACHE_TTL', 300))
+
+# 'weights' maps normalized item name -> weight of the first row with that name;
+# 'rows' maps normalized item name -> sorted sheet row numbers of its rows (None if unknown);
+# 'version' changes whenever the cached catalog is edited or dropped
+_items_cache = {'items': None, 'weights': None, 'rows': None, 'loaded_at': 0.0, 'version': 0, 'hits': 0, 'stale_hits': 0, 'misses': 0}
+_items_cache_lock = threading.RLock()
+
+def _fetch_item_rows():
+    """
+    Read the items sheet and return the catalog plus the sheet row number of each item.
+    """
+    sheet_id = os.environ.get('ITEMS_SHEET_ID')
+    if not sheet_id:
+        raise ValueError("ITEMS_SHEET_ID environment variable not set")
     
-    # Create credentials
-    credentials = Credentials.from_service_account_info(creds_dict, scopes=scope)
+    records = _with_worksheet(sheet_id, lambda sheet: sheet.get_all_records())
     
-    # Create client
-    client = gspread.authorize(credentials)
-    return client
+    # Convert to expected format
+    items = []
+    row_numbers = []
+    for i, record in enumerate(records):
+        if record.get('Item Name') or record.get('Item'):  # Handle different column names
+            item_name = record.get('Item Name', record.get('Item', ''))
+            weight = record.get('Weight (lbs)', record.get('Weight', 0))
+            items.append({
+                'Item': item_name,
+                'Weight': weight
+            })
+            row_numbers.append(i + 2)  # Records start below the header row
+    return items, row_numbers
+
+def _normalize_name(name):
+    """
+    Normalize an item or vendor name for case-insensitive lookups.
+    """
+    return str(name).lower().strip()
+
+def _build_weight_index(items):
+    """
+    Build the normalized name -> weight index, keeping the first row for duplicate names.
+    """
+    weights = {}
+    for item in items:
+        weights.setdefault(_normalize_name(item['Item']), item['Weight'])
+    return weights
+
+def _build_row_index(items, row_numbers):
+    """
+    Build the normalized name -> sorted sheet row numbers index.
+    """
+    rows = {}
+    for item, row_number in zip(items, row_numbers):
+        rows.setdefault(_normalize_name(item['Item']), []).append(row_number)
+    return rows
+
+def _get_items_catalog():
+    """
+    Return the cached (items, weight index) pair. Past the TTL the cached pair is still
+    returned while a background read refreshes it; the caller only waits for the sheet
+    when nothing is cached or it is older than SHEETS_MAX_STALENESS.
+    Concurrent misses share a single read. Callers must not mutate the returned objects.
+    """
+    with _items_cache_lock:
+        items = _items_cache['items']
+        state = _cache_state(_items_cache['loaded_at'] if items is not None else None, ITEMS_CACHE_TTL)
+        if state == 'fresh':
+            _items_cache['hits'] += 1
+            return items, _items_cache['weights']
+        if state == 'stale':
+            _items_cache['stale_hits'] += 1
+            _refresh_in_background('items', _load_items_catalog)
+            return items, _items_cache['weights']
+        _items_cache['misses'] += 1
+    return _single_flight.do('items', _load_items_catalog)
+
+def _load_items_catalog():
+    """
+    Read the items sheet and install it as the cached catalog, unless the cache was
+    edited or invalidated while the read was in flight (the read may predate that change).
+    """
+    with _items_cache_lock:
+        version = _items_cache['version']
+    items, row_numbers = _fetch_item_rows()
+    weights = _build_weight_index(items)
+    with _items_cache_lock:
+        if _items_cache['version'] == version:
+            _items_cache['items'] = items
+            _items_cache['weights'] = weights
+            _items_cache['rows'] = _build_row_index(items, row_numbers)
+            _items_cache['loaded_at'] = time.monotonic()
+    return items, weights
+
+def invalidate_items_cache():
+    """
+    Drop the cached items catalog so the next read goes to Google.
+    """
+    with _items_cache_lock:
+        _items_cache['items'] = None
+        _items_cache['version'] += 1
+
+def _contiguous_row_ranges(row_numbers):
+    """
+    Group 1-indexed row numbers into sorted, inclusive (start, end) runs.
+    """
+    ranges = []
+    for row_num in sorted(set(row_numbers)):
+        if ranges and row_num == ranges[-1][1] + 1:
+            ranges[-1][1] = row_num
+        else:
+            ranges.append([row_num, row_num])
+    return [tuple(r) for r in ranges]
+
+def _delete_rows_batch(sheet, row_numbers):
+    """
+    Delete the given 1-indexed rows with one batch_update of deleteDimension requests.
+    """
+    delete_requests = _delete_rows_requests(sheet, row_numbers)
+    if delete_requests:
+        sheet.spreadsheet.batch_update({'requests': delete_requests})
+
+def _delete_rows_requests(sheet, row_numbers):
+    """
+    deleteDimension requests for the given 1-indexed rows, one per contiguous run.
+    Runs are deleted bottom-up so earlier deletes do not shift later ones.
+    """
+    ranges = _contiguous_row_ranges(row_numbers)
+    return [{
+        'deleteDimension': {
+            'range': {
+                'sheetId': sheet.id,
+                'dimension': 'ROWS',
+                'startIndex': start - 1,
+                'endIndex': end,
+            }
+        }
+    } for start, end in reversed(ranges)]
 
 def get_items_data():
     """
-    Get all items data from Google Sheets.
+    Get all items data (served from the in-process catalog cache).
     Returns list of dictionaries with item data.
     """
     try:
-        client = get_google_sheets_client()
-        sheet_id = os.environ.get('ITEMS_SHEET_ID')
-        if not sheet_id:
-            raise ValueError("ITEMS_SHEET_ID environment variable not set")
-        
-        sheet = client.open_by_key(sheet_id).sheet1
-        records = sheet.get_all_records()
-        
-        # Convert to expected format
-        items = []
-        for record in records:
-            if record.get('Item Name') or record.get('Item'):  # Handle different column names
-                item_name = record.get('Item Name', record.get('Item', ''))
-                weight = record.get('Weight (lbs)', record.get('Weight', 0))
-                items.append({
-                    'Item': item_name,
-                    'Weight': weight
-                })
-        return items
+        mirror = _mirror_for_reads()
+        if mirror is not None:
+            return mirror.items()
+        items, _ = _get_items_catalog()
+        return list(items)
     except Exception as e:
         print(f"Error getting items data: {e}")
         return []
@@ -76,133 +550,664 @@ def get_item_weight(item_name):
     Get weight for a specific item from Google Sheets.
     Returns weight as float or None if not found.
     """
-    items = get_items_data()
-    item_name_lower = item_name.lower().strip()
-    
-    for item in items:
-        if item['Item'].lower().strip() == item_name_lower:
-            return float(item['Weight'])
-    return None
+    try:
+        mirror = _mirror_for_reads()
+        if mirror is not None:
+            weight = mirror.item_weight(item_name)
+        else:
+            _, weights = _get_items_catalog()
+            weight = weights.get(_normalize_name(item_name))
+    except Exception as e:
+        print(f"Error getting items data: {e}")
+        return None
+    if weight is None:
+        return None
+    return float(weight)
 
 def add_item_to_sheet(name, weight):
     """
     Add a new item to the Google Sheets items list.
     """
     try:
-        client = get_google_sheets_client()
         sheet_id = os.environ.get('ITEMS_SHEET_ID')
-        sheet = client.open_by_key(sheet_id).sheet1
         
-        # Check if item already exists
-        existing_items = get_item_names()
-        if name.lower().strip() in [item.lower().strip() for item in existing_items]:
+        # Check against the cached normalized names, which track our own adds and removes
+        mirror = _mirror_for_reads()
+        if mirror is not None:
+            exists = mirror.has_item(name)
+        else:
+            _, weights = _get_items_catalog()
+            exists = _normalize_name(name) in weights
+        if exists:
             raise ValueError("Item already exists")
-        
+
         # Add new row
-        sheet.append_row([name, weight])
+        response = _with_worksheet(sheet_id, lambda sheet: sheet.append_row([name, weight]))
+        with _items_cache_lock:
+            _items_cache['version'] += 1
+            item = {'Item': name, 'Weight': sheet_value(weight)}
+            if _items_cache['items'] is not None:
+                _items_cache['items'].append(item)
+                _items_cache['weights'].setdefault(_normalize_name(name), item['Weight'])
+                row_number = _appended_start_row(response)
+                if row_number is None or _items_cache['rows'] is None:
+                    _items_cache['rows'] = None
+                else:
+                    insort(_items_cache['rows'].setdefault(_normalize_name(name), []), row_number)
+            mirror = get_mirror()
+            if mirror is not None:
+                mirror.add_item(name, item['Weight'])
         return True
     except Exception as e:
         print(f"Error adding item: {e}")
         raise e
 
+def sheet_value(value):
+    """
+    Convert a value the way get_all_records would read it back from the sheet.
+    """
+    if isinstance(value, str):
+        return numericise(value, default_blank='')
+    return value
+
+def _drop_cached_item(name, row_number):
+    """
+    Remove the first catalog (and mirror) entry with this name, mirroring a delete of
+    the given sheet row: rows below it move up one in the row index. name is the cell as
+    read from the sheet; it is numericised like the catalog rows before it is compared.
+    """
+    key = _normalize_name(numericise(name))
+    with _items_cache_lock:
+        _items_cache['version'] += 1
+        mirror = get_mirror()
+        if mirror is not None:
+            mirror.remove_item(key)
+        items = _items_cache['items']
+        if items is None:
+            return
+        rows = _items_cache['rows']
+        if rows is not None:
+            for row_key, numbers in list(rows.items()):
+                numbers = [n - 1 if n > row_number else n for n in numbers if n != row_number]
+                if numbers:
+                    rows[row_key] = numbers
+                else:
+                    del rows[row_key]
+        for i, item in enumerate(items):
+            if _normalize_name(item['Item']) == key:
+                del items[i]
+                break
+        else:
+            return
+        # Re-point the index at the next row with the same normalized name, if any
+        weights = _items_cache['weights']
+        weights.pop(key, None)
+        for item in items:
+            if _normalize_name(item['Item']) == key:
+                weights[key] = item['Weight']
+                break
+
+def _find_item_row(sheet_id, name):
+    """
+    Return (sheet row number, column A value) of the first item row with this name, or
+    (None, None). The row comes from the row index and is confirmed with a one-cell read;
+    if the index has no such row or the cell no longer matches (the sheet was edited by
+    hand), column A is scanned instead and the catalog is dropped so it is rebuilt.
+    Cells are numericised before they are compared, as the catalog rows are.
+    """
+    key = _normalize_name(name)
+    _get_items_catalog()
+    with _items_cache_lock:
+        rows = _items_cache['rows']
+        row_numbers = rows.get(key) if rows is not None else None
+        row_number = row_numbers[0] if row_numbers else None
+    if row_number is not None:
+        values = _with_worksheet(sheet_id, lambda sheet: sheet.get(f"A{row_number}"))
+        cell = values[0][0] if values and values[0] else ''
+        if _normalize_name(numericise(cell)) == key:
+            return row_number, cell
+    column = _with_worksheet(sheet_id, lambda sheet: sheet.col_values(1))
+    for i, cell in enumerate(column[1:]):
+        if _normalize_name(numericise(cell)) == key:
+            invalidate_items_cache()
+            return i + 2, cell
+    if row_numbers is None and rows is not None:
+        return None, None
+    invalidate_items_cache()
+    return None, None
+
 def remove_item_from_sheet(name):
     """
     Remove an item from the Google Sheets items list.
     """
     try:
-        client = get_google_sheets_client()
         sheet_id = os.environ.get('ITEMS_SHEET_ID')
-        sheet = client.open_by_key(sheet_id).sheet1
         
-        # Find and delete the row
-        all_values = sheet.get_all_values()
-        for i, row in enumerate(all_values):
-            if row and row[0].lower().strip() == name.lower().strip():
-                sheet.delete_rows(i + 1)  # Sheets are 1-indexed
-                return True
-        return False
+        row_number, cell = _find_item_row(sheet_id, name)
+        if row_number is None:
+            return False
+        _delete_rows_batch(get_worksheet(sheet_id), [row_number])
+        _drop_cached_item(cell, row_number)
+        return True
     except Exception as e:
         print(f"Error removing item: {e}")
         raise e
 
-def save_shipping_history(item_name, per_unit_cost, per_unit_cost_offset, quantity=1, vendor=None, is_ups='Yes', weight_used='', po_number='', receiving_location=''):
+def build_shipping_history_row(item_name, per_unit_cost, per_unit_cost_offset, quantity=1, vendor=None, is_ups='Yes', weight_used='', po_number='', receiving_location=''):
     """
-    Save shipping history to Google Sheets, including quantity, vendor, UPS flag, weight used, PO number, and receiving location.
+    Build a shipping history row in sheet column order, stamped with the current time.
+    """
+    # Create timestamp
+    timestamp = datetime.now().isoformat(sep=' ', timespec='seconds')
+    # Vendor, UPS, weight used, PO, and receiving location are the last columns
+    return [item_name, per_unit_cost, per_unit_cost_offset, timestamp, quantity, vendor or "", is_ups, weight_used, po_number, receiving_location]
+
+# In-memory copy of the history sheet, synced incrementally from the tail.
+# _history_lock guards the store and is only held for local work, so reads never wait
+# on Google; _history_write_lock serializes sheet writes with applying sync results
+# (always taken before _history_lock).
+_history_store = HistoryStore()
+_history_lock = threading.RLock()
+_history_write_lock = threading.RLock()
+# synced_at is the monotonic time of the last successful sync
+_history_stats = {'full_syncs': 0, 'tail_syncs': 0, 'rows_ingested': 0, 'stale_reads': 0, 'synced_at': None}
+
+# A history store synced this recently is read without checking the sheet for new rows
+HISTORY_CACHE_TTL = float(os.environ.get('HISTORY_CACHE_TTL', 15))
+
+def _history_position():
+    with _history_lock:
+        return _history_store.generation, _history_store.last_row_number
+
+def _full_history_sync(sheet_id):
+    """
+    Reload the whole history sheet into the store. The rows are parsed into a new store
+    without holding either lock, so reads keep being served from the old one meanwhile, and
+    it replaces the old one only if that did not change while the read was in flight (that
+    change is newer than the read).
     """
+    global _history_store
+    position = _history_position()
+    values = _with_worksheet(sheet_id, lambda sheet: sheet.get_all_values())
+    store = HistoryStore()
+    store.load(values)
+    with _history_write_lock, _history_lock:
+        if _history_position() != position:
+            return
+        store.generation = _history_store.generation + 1
+        _history_store = store
+        _history_stats['synced_at'] = time.monotonic()
+        _history_stats['full_syncs'] += 1
+        _history_stats['rows_ingested'] += len(store)
+
+# Sheet columns holding the history fields the item/vendor lookups need
+HISTORY_LOOKUP_COLUMNS = {'Item Name': 'A', 'Timestamp': 'D', 'Vendor': 'F', 'Weight Used': 'H'}
+
+def _read_history_columns(sheet_id, columns):
+    """
+    Read only the given columns (letters) of the history data rows with one batch_get.
+    Returns one list per sheet row from row 2 on, laid out in HISTORY_COLUMNS order
+    with the columns that were not read left blank.
+    """
+    ranges = [f"{column}2:{column}" for column in columns]
+    value_ranges = _with_worksheet(sheet_id, lambda sheet: sheet.batch_get(ranges, major_dimension='COLUMNS'))
+    indexes = [a1_range_to_grid_range(column)['startColumnIndex'] for column in columns]
+    width = max(indexes + [len(HISTORY_COLUMNS) - 1]) + 1
+    rows = []
+    for index, value_range in zip(indexes, value_ranges):
+        values = value_range[0] if value_range else []
+        while len(rows) < len(values):
+            rows.append([''] * width)
+        for row, value in zip(rows, values):
+            row[index] = value
+    return rows
+
+def _lookup_history(fields):
+    """
+    History records for the item/vendor lookups. Until the full history has been
+    loaded this reads only the columns holding the given fields instead of every column.
+    """
+    sheet_id = os.environ.get('HISTORY_SHEET_ID')
+    if not sheet_id:
+        return []
+    if _history_store.loaded or _mirror_for_reads() is not None:
+        return get_shipping_history()
+    # Hold off the writer so no row is read from the sheet and also seen as pending
+    with _history_write_lock:
+        try:
+            rows = _read_history_columns(sheet_id, [HISTORY_LOOKUP_COLUMNS[field] for field in fields])
+        except Exception as e:
+            print(f"Error getting shipping history: {e}")
+            return []
+        history = [record for record in map(history_record_from_row, rows) if record is not None]
+        with _history_lock:
+            history.extend(_pending_history_records())
+        return history
+
+def _sync_history(sheet_id):
+    """
+    Bring the store up to date by reading only the rows after the last ingested one.
+    The last ingested row is re-read with them; if it no longer matches, rows were
+    deleted or the sheet shrank and a full resync runs instead. The sheet is read
+    without holding _history_lock; a read that raced a local change is dropped.
+    """
+    with _history_lock:
+        if not _history_store.loaded:
+            loaded = False
+        else:
+            loaded = True
+            position = (_history_store.generation, _history_store.last_row_number)
+            last_col = rowcol_to_a1(1, _history_store.width).rstrip('0123456789')
+    if not loaded:
+        _full_history_sync(sheet_id)
+        return
+    last_row = position[1]
+    values = _with_worksheet(sheet_id, lambda sheet: sheet.get(f"A{last_row}:{last_col}"))
+    with _history_write_lock, _history_lock:
+        if _history_position() != position:
+            return
+        if values and _history_store.matches(last_row, values[0]):
+            _history_store.extend(values[1:])
+            _history_stats['synced_at'] = time.monotonic()
+            _history_stats['tail_syncs'] += 1
+            _history_stats['rows_ingested'] += len(values) - 1
+            return
+    _full_history_sync(sheet_id)
+
+def _refresh_history(sheet_id):
+    """
+    Sync the store (and mirror) with the sheet. Concurrent callers share one sync,
+    so they must not hold either history lock while calling this.
+    """
+    _single_flight.do(('history', sheet_id), lambda: _sync_history_and_mirror(sheet_id))
+
+def _sync_history_and_mirror(sheet_id):
+    _sync_history(sheet_id)
+    with _history_write_lock:
+        _mirror_history()
+
+def _ensure_history(sheet_id):
+    """
+    Make the store ready to serve a read. It is synced inline only when it is not
+    loaded or older than SHEETS_MAX_STALENESS; past HISTORY_CACHE_TTL the current
+    snapshot is served while a background sync catches up.
+    Must not be called with either history lock held.
+    """
+    state = _cache_state(_history_stats['synced_at'] if _history_store.loaded else None, HISTORY_CACHE_TTL)
+    if state == 'expired':
+        _refresh_history(sheet_id)
+    elif state == 'stale':
+        with _history_lock:
+            _history_stats['stale_reads'] += 1
+        _refresh_in_background(('history', sheet_id), lambda: _sync_history_and_mirror(sheet_id))
+
+_mirror_history_state = {'generation': None, 'rows': 0}
+
+def _mirror_history():
+    """
+    Copy history store changes into the SQLite mirror: new rows are appended,
+    anything else (full reload, deletes) replaces the table. Caller holds _history_write_lock,
+    which every store change takes, so the store cannot change underneath; it should not
+    hold _history_lock unless only rows were appended, or readers wait on the table replace.
+    """
+    mirror = get_mirror()
+    if mirror is None or not _history_store.loaded:
+        return
+    if _mirror_history_state['generation'] != _history_store.generation:
+        mirror.replace_history(_history_store.numbered_records())
+    elif _mirror_history_state['rows'] < len(_history_store):
+        mirror.append_history(_history_store.numbered_records(_mirror_history_state['rows']))
+    _mirror_history_state['generation'] = _history_store.generation
+    _mirror_history_state['rows'] = len(_history_store)
+
+def _appended_start_row(response):
+    """
+    First sheet row written by an append call, from the response's updatedRange (None if unknown).
+    """
+    updated_range = (response or {}).get('updates', {}).get('updatedRange', '')
     try:
-        client = get_google_sheets_client()
-        sheet_id = os.environ.get('HISTORY_SHEET_ID')
-        if not sheet_id:
-            raise ValueError("HISTORY_SHEET_ID environment variable not set")
-        sheet = client.open_by_key(sheet_id).sheet1
-        # Create timestamp
-        timestamp = datetime.now().isoformat(sep=' ', timespec='seconds')
-        # Add new row (add vendor, UPS, weight used, PO, and receiving location as last columns)
-        row = [item_name, per_unit_cost, per_unit_cost_offset, timestamp, quantity, vendor or "", is_ups, weight_used, po_number, receiving_location]
-        sheet.append_row(row)
+        return a1_range_to_grid_range(updated_range.split('!')[-1])['startRowIndex'] + 1
+    except Exception:
+        return None
+
+def _apply_appended_history(response, rows):
+    """
+    Add rows we just appended to the store if they landed right after the last ingested row,
+    so the next sync does not have to read them back. Otherwise someone else wrote to the
+    sheet since the last sync, so the store is marked out of date and the next read (which
+    should see these rows) syncs inline. Caller holds _history_lock.
+    """
+    if not _history_store.loaded:
+        return
+    if _appended_start_row(response) == _history_store.last_row_number + 1:
+        _history_store.extend(rows)
+    else:
+        _history_stats['synced_at'] = None
+
+def _append_history_rows(rows):
+    """
+    Append rows to the history sheet with a single API call and return the append response.
+    Caller holds _history_write_lock and passes the response to _commit_history_rows.
+    """
+    sheet_id = os.environ.get('HISTORY_SHEET_ID')
+    if not sheet_id:
+        raise ValueError("HISTORY_SHEET_ID environment variable not set")
+    return _with_worksheet(sheet_id, lambda sheet: sheet.append_rows(rows))
+
+def _commit_history_rows(rows, response):
+    """
+    Apply rows that were just appended to the local store and mirror.
+    """
+    with _history_lock:
+        _apply_appended_history(response, rows)
+        _mirror_history()
+
+def save_shipping_history_rows(rows):
+    """
+    Append several shipping history rows with a single Sheets API call.
+    Returns True if all rows were written, False if none were.
+    """
+    if not rows:
+        return True
+    try:
+        with _history_write_lock:
+            response = _append_history_rows(rows)
+            _commit_history_rows(rows, response)
         return True
     except Exception as e:
         print(f"Error saving shipping history: {e}")
         return False
 
+def save_shipping_history(item_name, per_unit_cost, per_unit_cost_offset, quantity=1, vendor=None, is_ups='Yes', weight_used='', po_number='', receiving_location=''):
+    """
+    Save shipping history to Google Sheets, including quantity, vendor, UPS flag, weight used, PO number, and receiving location.
+    """
+    row = build_shipping_history_row(item_name, per_unit_cost, per_unit_cost_offset, quantity, vendor, is_ups, weight_used, po_number, receiving_location)
+    return save_shipping_history_rows([row])
+
+# Local spool for history rows that have not been written to the sheet yet. Must be on
+# storage that survives a redeploy (e.g. a mounted disk), or queued rows are lost with it.
+# Unset, history is written synchronously instead of behind the request.
+HISTORY_SPOOL_PATH = os.environ.get('HISTORY_SPOOL_PATH')
+
+_history_writer = None
+_history_writer_lock = threading.Lock()
+
+def get_history_writer():
+    """
+    Return the process-wide write-behind history writer, starting it (and replaying the spool) on first use.
+    Returns None if HISTORY_SPOOL_PATH is not set.
+    """
+    global _history_writer
+    with _history_writer_lock:
+        if _history_writer is None:
+            if not HISTORY_SPOOL_PATH:
+                return None
+            _history_writer = HistoryWriter(_append_history_rows, HISTORY_SPOOL_PATH, commit=_commit_history_rows,
+                                            flush_lock=_history_write_lock, commit_lock=_history_lock,
+                                            is_permanent=_is_permanent_write_error)
+            _history_writer.start()
+        return _history_writer
+
+def enqueue_shipping_history_rows(rows):
+    """
+    Queue history rows for a background batched write to Google Sheets.
+    Returns True as soon as the rows are safely in the local spool.
+    Without a spool path the rows are written before returning, as save_shipping_history_rows does.
+    """
+    writer = get_history_writer()
+    if writer is None:
+        return save_shipping_history_rows(rows)
+    return writer.enqueue(rows)
+
+def _history_writer_has_pending():
+    return _history_writer is not None and _history_writer.get_stats()['pending'] > 0
+
+def _pending_history_records():
+    """
+    Records for rows that are spooled but not written yet, so reads see them immediately.
+    Caller holds _history_lock so no row is seen both pending and written.
+    """
+    if _history_writer is None:
+        return []
+    return [history_record_from_row(row) for row in _history_writer.pending_rows()]
+
 def get_shipping_history():
     """
-    Get all shipping history from Google Sheets.
-    Returns list of dictionaries with history data, including vendor, UPS, and receiving location.
+    Get all shipping history (synced incrementally from Google Sheets), plus rows still waiting in the write-behind queue.
+    Returns a list of records keyed by column name (HistoryRecord from the store, dicts from the mirror),
+    including vendor, UPS, and receiving location. The records are shared; do not modify them.
     """
     try:
-        client = get_google_sheets_client()
         sheet_id = os.environ.get('HISTORY_SHEET_ID')
         if not sheet_id:
             return []
-        sheet = client.open_by_key(sheet_id).sheet1
-        records = sheet.get_all_records()
-        # Convert to expected format
-        history = []
-        for record in records:
-            if record.get('Item Name'):
-                history.append({
-                    'Item Name': record['Item Name'],
-                    'Per-Unit Shipping Cost': record.get('Per-Unit Shipping Cost', 0),
-                    'Per-Unit Shipping Cost (Offset)': record.get('Per-Unit Shipping Cost (Offset)', 0),
-                    'Timestamp': record.get('Timestamp', ''),
-                    'Quantity': record.get('Quantity', 1),
-                    'Vendor': record.get('Vendor', ''),
-                    'UPS': record.get('UPS', ''),
-                    'Weight Used': record.get('Weight Used', ''),
-                    'PO': record.get('PO', ''),
-                    'Receiving': record.get('Receiving', '')
-                })
+        mirror = _mirror_for_reads()
+        if mirror is None:
+            _ensure_history(sheet_id)
+        with _history_lock:
+            history = mirror.history() if mirror is not None else _history_store.records()
+            history.extend(_pending_history_records())
         return history
     except Exception as e:
         print(f"Error getting shipping history: {e}")
         return []
 
+def get_item_shipping_averages():
+    """
+    Return the quantity-weighted average offset shipping cost per (item, vendor)
+    from the running sums, including rows still waiting to be written.
+    """
+    try:
+        sheet_id = os.environ.get('HISTORY_SHEET_ID')
+        if not sheet_id:
+            return []
+        # With a synced mirror the background sync keeps the store current
+        if _mirror_for_reads() is None or not _history_store.loaded:
+            _ensure_history(sheet_id)
+        with _history_lock:
+            return _history_store.averages(_pending_history_records())
+    except Exception as e:
+        print(f"Error getting shipping averages: {e}")
+        return []
+
 def delete_item_shipping_history(item_name, vendor=None):
     """
     Delete all shipping history for a specific item and vendor (if provided).
     """
     try:
-        client = get_google_sheets_client()
         sheet_id = os.environ.get('HISTORY_SHEET_ID')
         if not sheet_id:
             return True
-        sheet = client.open_by_key(sheet_id).sheet1
-        # Find and delete rows
-        all_values = sheet.get_all_values()
-        rows_to_delete = []
-        for i, row in enumerate(all_values):
-            if row and row[0].lower().strip() == item_name.lower().strip():
-                if vendor is None or (len(row) > 5 and row[5].lower().strip() == vendor.lower().strip()):
-                    rows_to_delete.append(i + 1)  # Sheets are 1-indexed
-        # Delete rows in reverse order to maintain indices
-        for row_num in reversed(rows_to_delete):
-            sheet.delete_rows(row_num)
+        # Syncs and the writer wait on the write lock; readers keep using the store until it is updated
+        with _history_write_lock:
+            # Only item name, timestamp and vendor are needed to find rows and check the store
+            rows = _read_history_columns(sheet_id, ['A', 'D', 'F'])
+            sheet = get_worksheet(sheet_id)
+            def matches(row):
+                if str(row[0]).lower().strip() != item_name.lower().strip():
+                    return False
+                return vendor is None or str(row[5] or '').lower().strip() == vendor.lower().strip()
+            rows_to_delete = [i + 2 for i, row in enumerate(rows) if matches(row)]  # Data starts on sheet row 2
+            # Delete contiguous runs together in a single request
+            _delete_rows_batch(sheet, rows_to_delete)
+            with _history_lock:
+                # Rows still waiting in the write-behind queue would otherwise be written back
+                if _history_writer is not None:
+                    _history_writer.discard(matches)
+                in_sync = _history_store.loaded and len(rows) + 1 == _history_store.last_row_number and (not rows or _history_store.matches(len(rows) + 1, rows[-1]))
+                if in_sync:
+                    # Store matched the sheet, so just subtract the deleted rows from it
+                    _history_store.delete(rows_to_delete)
+            if _history_store.loaded and not in_sync:
+                # Store was behind the sheet; reload it
+                _full_history_sync(sheet_id)
+            _mirror_history()
         return True
     except Exception as e:
         print(f"Error deleting shipping history: {e}")
         return False 
 
+# History archival: rows older than HISTORY_ARCHIVE_AFTER_DAYS (0 = off) move to per-year
+# archive worksheets in the history spreadsheet, leaving one summary row per (item, vendor)
+HISTORY_ARCHIVE_AFTER_DAYS = float(os.environ.get('HISTORY_ARCHIVE_AFTER_DAYS', 0))
+HISTORY_ARCHIVE_INTERVAL = float(os.environ.get('HISTORY_ARCHIVE_INTERVAL', 24 * 3600))
+HISTORY_ARCHIVE_TITLE = os.environ.get('HISTORY_ARCHIVE_TITLE', 'History Archive {year}')
+# Most rows moved per run (oldest first), so one batch_update stays a manageable size
+HISTORY_ARCHIVE_MAX_ROWS = int(os.environ.get('HISTORY_ARCHIVE_MAX_ROWS', 5000))
+# Pause between runs while a backlog larger than HISTORY_ARCHIVE_MAX_ROWS is worked through
+HISTORY_ARCHIVE_BACKLOG_PAUSE = 60
+# PO written on summary rows; they are folded into the next summary instead of being archived
+ARCHIVE_SUMMARY_PO = 'Archive summary'
+
+_archive_lock = threading.Lock()
+_archive_thread = None
+_archive_stats = {'runs': 0, 'rows_archived': 0, 'summary_rows': 0, 'failures': 0, 'last_run': None, 'last_error': None}
+
+def _cell_data(value):
+    """
+    CellData writing a value read with UNFORMATTED_VALUE back as it was.
+    """
+    if value is None or value == '':
+        return {}
+    if isinstance(value, bool):
+        return {'userEnteredValue': {'boolValue': value}}
+    if isinstance(value, (int, float)):
+        return {'userEnteredValue': {'numberValue': value}}
+    return {'userEnteredValue': {'stringValue': str(value)}}
+
+def _row_data(values):
+    return {'values': [_cell_data(value) for value in values]}
+
+def _archive_cutoff_epoch(cutoff):
+    """
+    Compare-ready form of an archive cutoff. History timestamps are naive server-local wall
+    times, which timestamp_epoch reads as UTC; so a cutoff given as real epoch seconds or as
+    an aware datetime is first turned into local wall time, and naive ones are taken as is.
+    """
+    if isinstance(cutoff, (int, float)) and not isinstance(cutoff, bool):
+        cutoff = datetime.fromtimestamp(cutoff)
+    elif isinstance(cutoff, str):
+        try:
+            cutoff = datetime.fromisoformat(cutoff.strip())
+        except ValueError:
+            raise ValueError(f"Not an ISO date/time: {cutoff!r}")
+    if not isinstance(cutoff, datetime):
+        raise ValueError(f"Not an ISO date/time: {cutoff!r}")
+    if cutoff.tzinfo is not None:
+        cutoff = cutoff.astimezone().replace(tzinfo=None)
+    return timestamp_epoch(cutoff)
+
+def archive_shipping_history(cutoff=None, max_rows=None):
+    """
+    Move history rows timestamped before cutoff (a datetime, ISO string or epoch seconds;
+    default HISTORY_ARCHIVE_AFTER_DAYS ago) to per-year archive worksheets, and replace
+    them in the live sheet with one summary row per (item, vendor) that keeps the shipping
+    averages, last weights used and item names by vendor unchanged. Earlier summary rows
+    of the affected pairs are folded into the new ones. At most max_rows (default
+    HISTORY_ARCHIVE_MAX_ROWS) of the oldest rows move per call; the rest are left for later
+    calls. Each call is written with one batch_update, which the API applies all-or-nothing.
+    Returns counts of what was moved and what is left, or None on error.
+    """
+    sheet_id = os.environ.get('HISTORY_SHEET_ID')
+    if not sheet_id:
+        return None
+    if cutoff is None:
+        cutoff = datetime.now() - timedelta(days=HISTORY_ARCHIVE_AFTER_DAYS)
+    cutoff_epoch = _archive_cutoff_epoch(cutoff)
+    if max_rows is None:
+        max_rows = HISTORY_ARCHIVE_MAX_ROWS
+    try:
+        # The writer and syncs wait on the write lock; readers keep using the store until it is reloaded
+        with _history_write_lock:
+            # Unformatted so archived cells are copied with their original types
+            values = _with_worksheet(sheet_id, lambda sheet: sheet.get_values(
+                value_render_option=ValueRenderOption.unformatted, date_time_render_option=DateTimeOption.formatted_string))
+            sheet = get_worksheet(sheet_id)
+            live = HistoryStore()
+            live.load(values)
+            archived = []
+            summaries = []
+            for row_number, record in live.numbered_records():
+                if record.epoch is None or record.epoch >= cutoff_epoch:
+                    continue
+                (summaries if record.po == ARCHIVE_SUMMARY_PO else archived).append((row_number, record))
+            # Oldest first, so every row left behind is at least as new as the summaries written now
+            archived.sort(key=lambda pair: (pair[1].epoch, pair[0]))
+            remaining = max(len(archived) - max_rows, 0)
+            archived = archived[:max_rows]
+            result = {'rows_archived': len(archived), 'rows_remaining': remaining, 'summary_rows': 0, 'years': []}
+            if archived:
+                pairs = set((record.item_name, record.vendor) for _, record in archived)
+                folded = [(row_number, record) for row_number, record in summaries if (record.item_name, record.vendor) in pairs]
+                # Sheet order, so each pair's UPS flag still comes from its first row
+                replaced = sorted(archived + folded, key=lambda pair: pair[0])
+                header = live.header
+                new_rows = [[dict(zip(HISTORY_COLUMNS, row)).get(column, '') for column in header]
+                            for row in summary_rows([record for _, record in replaced], ARCHIVE_SUMMARY_PO)]
+
+                by_year = {}
+                for row_number, record in sorted(archived, key=lambda pair: pair[0]):
+                    year = datetime.fromtimestamp(record.epoch, timezone.utc).year
+                    by_year.setdefault(year, []).append(values[row_number - 1])
+                worksheets = {worksheet.title: worksheet.id for worksheet in sheet.spreadsheet.worksheets()}
+                next_id = max(worksheets.values()) + 1
+                batch_requests = []
+                for year in sorted(by_year):
+                    title = HISTORY_ARCHIVE_TITLE.format(year=year)
+                    rows = by_year[year]
+                    if title not in worksheets:
+                        worksheets[title] = next_id
+                        next_id += 1
+                        batch_requests.append({'addSheet': {'properties': {'sheetId': worksheets[title], 'title': title}}})
+                        rows = [header] + rows
+                    batch_requests.append({'appendCells': {'sheetId': worksheets[title], 'rows': [_row_data(row) for row in rows], 'fields': 'userEnteredValue'}})
+                batch_requests.extend(_delete_rows_requests(sheet, [row_number for row_number, _ in replaced]))
+                batch_requests.append({'insertDimension': {
+                    'range': {'sheetId': sheet.id, 'dimension': 'ROWS', 'startIndex': 1, 'endIndex': 1 + len(new_rows)},
+                    'inheritFromBefore': False,
+                }})
+                batch_requests.append({'updateCells': {
+                    'start': {'sheetId': sheet.id, 'rowIndex': 1, 'columnIndex': 0},
+                    'rows': [_row_data(row) for row in new_rows],
+                    'fields': 'userEnteredValue',
+                }})
+                sheet.spreadsheet.batch_update({'requests': batch_requests})
+                result.update(summary_rows=len(new_rows), years=sorted(by_year))
+                if _history_store.loaded:
+                    _full_history_sync(sheet_id)
+                    _mirror_history()
+        with _archive_lock:
+            _archive_stats['runs'] += 1
+            _archive_stats['rows_archived'] += result['rows_archived']
+            _archive_stats['summary_rows'] += result['summary_rows']
+            _archive_stats['last_run'] = datetime.now().isoformat(sep=' ', timespec='seconds')
+        return result
+    except Exception as e:
+        with _archive_lock:
+            _archive_stats['failures'] += 1
+            _archive_stats['last_error'] = str(e)
+        print(f"Error archiving shipping history: {e}")
+        return None
+
+def _archive_loop():
+    while True:
+        result = archive_shipping_history()
+        time.sleep(HISTORY_ARCHIVE_BACKLOG_PAUSE if result and result['rows_remaining'] else HISTORY_ARCHIVE_INTERVAL)
+
+def start_history_archival():
+    """
+    Start the background thread that archives old history rows every HISTORY_ARCHIVE_INTERVAL
+    seconds (no-op unless HISTORY_ARCHIVE_AFTER_DAYS and HISTORY_SHEET_ID are set).
+    """
+    global _archive_thread
+    if HISTORY_ARCHIVE_AFTER_DAYS <= 0 or not os.environ.get('HISTORY_SHEET_ID'):
+        return
+    with _archive_lock:
+        if _archive_thread is None:
+            _archive_thread = threading.Thread(target=_archive_loop, name='history-archival', daemon=True)
+            _archive_thread.start()
+
 def get_items_with_weights():
     """
     Return all items with their weights as a list of dicts: {"name": ..., "weight": ...}
@@ -214,20 +1219,54 @@ def get_last_weight_used(item_name, vendor=None):
     """
     Return the most recent weight used for an item (optionally filtered by vendor) from the historic data sheet.
     """
-    history = get_shipping_history()
-    filtered = [r for r in history if r.get('Item Name', '').strip().lower() == item_name.strip().lower()]
-    if vendor:
-        filtered = [r for r in filtered if r.get('Vendor', '').strip().lower() == vendor.strip().lower()]
-    # Sort by timestamp descending
-    filtered.sort(key=lambda r: r.get('Timestamp', ''), reverse=True)
-    for record in filtered:
-        weight = record.get('Weight Used', '')
-        if weight not in (None, '', 'N/A'):
-            try:
-                return float(weight)
-            except Exception:
-                continue
-    return None 
+    mirror = _mirror_for_reads()
+    if mirror is not None and not _history_writer_has_pending():
+        return mirror.last_weight_used(item_name, vendor)
+    if _history_store.loaded:
+        # Answer from the store's last-weight index; the store already has our own
+        # writes and picks up others when it is revalidated
+        if mirror is None:
+            _ensure_history(os.environ.get('HISTORY_SHEET_ID'))
+        with _history_lock:
+            return _history_store.last_weight(item_name, vendor, _pending_history_records())
+    return last_weight_used(_lookup_history(['Item Name', 'Timestamp', 'Vendor', 'Weight Used']), item_name, vendor)
+
+def get_item_names_by_vendor(vendor):
+    """
+    Return the sorted, distinct item names that have shipping history for a vendor.
+    """
+    mirror = _mirror_for_reads()
+    if mirror is not None and not _history_writer_has_pending():
+        return mirror.item_names_by_vendor(vendor)
+    if _history_store.loaded:
+        # Answer from the store's vendor -> item names index
+        if mirror is None:
+            _ensure_history(os.environ.get('HISTORY_SHEET_ID'))
+        with _history_lock:
+            return _history_store.item_names_by_vendor(vendor, _pending_history_records())
+    return item_names_by_vendor(_lookup_history(['Item Name', 'Vendor']), vendor)
+
+VENDORS_CACHE_TTL = float(os.environ.get('VENDORS_CACHE_TTL', 300))
+
+# 'keys' holds the (normalized name, ZIP) pair of every cached vendor for duplicate checks
+_vendors_cache = {'vendors': None, 'keys': None, 'loaded_at': 0.0, 'version': 0, 'hits': 0, 'stale_hits': 0, 'misses': 0}
+_vendors_cache_lock = threading.RLock()
+
+def _fetch_vendors_data():
+    """
+    Read the vendors sheet from Google.
+    """
+    sheet_id = os.environ.get('VENDORS_SHEET_ID')
+    if not sheet_id:
+        raise ValueError("VENDORS_SHEET_ID environment variable not set")
+    records = _with_worksheet(sheet_id, lambda sheet: sheet.get_all_records())
+    vendors = []
+    for record in records:
+        name = record.get('Vendor Name')
+        zip_code = record.get('ZIP Code')
+        if name and zip_code:
+            vendors.append({'vendor': name, 'zip': str(zip_code)})
+    return vendors
 
 def get_vendors_data():
     """
@@ -235,43 +1274,216 @@ def get_vendors_data():
     Returns a list of dicts: { 'vendor': ..., 'zip': ... }
     """
     try:
-        client = get_google_sheets_client()
-        sheet_id = os.environ.get('VENDORS_SHEET_ID')
-        if not sheet_id:
-            raise ValueError("VENDORS_SHEET_ID environment variable not set")
-        sheet = client.open_by_key(sheet_id).sheet1
-        records = sheet.get_all_records()
-        vendors = []
-        for record in records:
-            name = record.get('Vendor Name')
-            zip_code = record.get('ZIP Code')
-            if name and zip_code:
-                vendors.append({'vendor': name, 'zip': str(zip_code)})
-        return vendors
+        mirror = _mirror_for_reads()
+        if mirror is not None:
+            return mirror.vendors()
+        vendors, _ = _get_vendors_catalog()
+        return list(vendors)
     except Exception as e:
         print(f"Error getting vendors data: {e}")
         return [] 
 
+def _vendor_key(name, zip_code):
+    return (_normalize_name(name), str(zip_code).strip())
+
+def _build_vendor_keys(vendors):
+    return set(_vendor_key(vendor['vendor'], vendor['zip']) for vendor in vendors)
+
+def _get_vendors_catalog():
+    """
+    Return the cached (vendors, duplicate-check keys) pair with the same stale-while-revalidate
+    rules as the items catalog. Callers must not mutate the returned objects.
+    """
+    with _vendors_cache_lock:
+        vendors = _vendors_cache['vendors']
+        state = _cache_state(_vendors_cache['loaded_at'] if vendors is not None else None, VENDORS_CACHE_TTL)
+        if state == 'fresh':
+            _vendors_cache['hits'] += 1
+            return vendors, _vendors_cache['keys']
+        if state == 'stale':
+            _vendors_cache['stale_hits'] += 1
+            _refresh_in_background('vendors', _load_vendors)
+            return vendors, _vendors_cache['keys']
+        _vendors_cache['misses'] += 1
+    return _single_flight.do('vendors', _load_vendors)
+
+def _load_vendors():
+    """
+    Read the vendors sheet and cache it, unless the cache changed while the read was in flight.
+    """
+    with _vendors_cache_lock:
+        version = _vendors_cache['version']
+    vendors = _fetch_vendors_data()
+    keys = _build_vendor_keys(vendors)
+    with _vendors_cache_lock:
+        if _vendors_cache['version'] == version:
+            _vendors_cache['vendors'] = vendors
+            _vendors_cache['keys'] = keys
+            _vendors_cache['loaded_at'] = time.monotonic()
+    return vendors, keys
+
 def add_vendor_to_sheet(name, zip_code):
     """
     Add a new vendor to the Google Sheets vendors list.
     Checks for duplicates (same name and zip).
     """
     try:
-        client = get_google_sheets_client()
         sheet_id = os.environ.get('VENDORS_SHEET_ID')
         if not sheet_id:
             raise ValueError("VENDORS_SHEET_ID environment variable not set")
-        sheet = client.open_by_key(sheet_id).sheet1
-        # Check for duplicates
-        records = sheet.get_all_records()
-        for record in records:
-            if (str(record.get('Vendor Name', '')).strip().lower() == name.strip().lower() and
-                str(record.get('ZIP Code', '')).strip() == str(zip_code).strip()):
-                raise ValueError("Vendor with this ZIP already exists.")
+        # Check for duplicates against the cached (name, ZIP) keys, which track our own adds
+        mirror = _mirror_for_reads()
+        if mirror is not None:
+            exists = mirror.has_vendor(name, zip_code)
+        else:
+            _, keys = _get_vendors_catalog()
+            exists = _vendor_key(name, zip_code) in keys
+        if exists:
+            raise ValueError("Vendor with this ZIP already exists.")
         # Add new row
-        sheet.append_row([name, zip_code])
+        _with_worksheet(sheet_id, lambda sheet: sheet.append_row([name, zip_code]))
+        with _vendors_cache_lock:
+            _vendors_cache['version'] += 1
+            if _vendors_cache['vendors'] is not None and name and zip_code:
+                vendor = {'vendor': name, 'zip': str(sheet_value(zip_code))}
+                _vendors_cache['vendors'].append(vendor)
+                _vendors_cache['keys'].add(_vendor_key(vendor['vendor'], vendor['zip']))
+            # Under the lock, so a sync whose read predates this add cannot replace the table after it
+            mirror = get_mirror()
+            if mirror is not None:
+                mirror.add_vendor(name, zip_code)
         return True
     except Exception as e:
         print(f"Error adding vendor: {e}")
-        raise e 
\ No newline at end of file
+        raise e
+
+def sync_mirror():
+    """
+    Refresh the SQLite mirror from Google Sheets. Returns True on success.
+    """
+    mirror = get_mirror()
+    if mirror is None:
+        return False
+    try:
+        # Read the sheets without holding the cache locks so page loads keep being served from
+        # cache meanwhile. The reads replace the mirror tables and the caches only if nothing was
+        # added or removed while they were in flight (the read may predate that change, and the
+        # mirror already has it); otherwise they are dropped and the next sync tries again
+        complete = True
+        if os.environ.get('ITEMS_SHEET_ID'):
+            with _items_cache_lock:
+                version = _items_cache['version']
+            items, row_numbers = _fetch_item_rows()
+            weights = _build_weight_index(items)
+            rows = _build_row_index(items, row_numbers)
+            with _items_cache_lock:
+                complete = _items_cache['version'] == version
+                if complete:
+                    mirror.replace_items(items)
+                    _items_cache['items'] = items
+                    _items_cache['weights'] = weights
+                    _items_cache['rows'] = rows
+                    _items_cache['loaded_at'] = time.monotonic()
+                    _items_cache['version'] += 1
+        if os.environ.get('VENDORS_SHEET_ID'):
+            with _vendors_cache_lock:
+                version = _vendors_cache['version']
+            vendors = _fetch_vendors_data()
+            keys = _build_vendor_keys(vendors)
+            with _vendors_cache_lock:
+                if _vendors_cache['version'] == version:
+                    mirror.replace_vendors(vendors)
+                    _vendors_cache['vendors'] = vendors
+                    _vendors_cache['keys'] = keys
+                    _vendors_cache['loaded_at'] = time.monotonic()
+                    _vendors_cache['version'] += 1
+                else:
+                    complete = False
+        sheet_id = os.environ.get('HISTORY_SHEET_ID')
+        if sheet_id:
+            _refresh_history(sheet_id)
+        # A mirror that has never held a full read must not start serving reads yet
+        if complete or mirror.synced:
+            mirror.mark_synced()
+        _mirror_stats['syncs'] += 1
+        _mirror_stats['last_sync'] = datetime.now().isoformat(sep=' ', timespec='seconds')
+        return True
+    except Exception as e:
+        _mirror_stats['failures'] += 1
+        _mirror_stats['last_error'] = str(e)
+        print(f"Error syncing sheets mirror: {e}")
+        return False
+
+def _mirror_sync_loop():
+    while True:
+        sync_mirror()
+        time.sleep(SHEETS_MIRROR_SYNC_INTERVAL)
+
+def start_mirror_sync():
+    """
+    Start the background thread that keeps the SQLite mirror fresh (no-op if the mirror is disabled).
+    """
+    global _mirror_thread
+    if get_mirror() is None:
+        return
+    with _mirror_lock:
+        if _mirror_thread is None:
+            _mirror_thread = threading.Thread(target=_mirror_sync_loop, name='sheets-mirror-sync', daemon=True)
+            _mirror_thread.start()
+
+def _warm_up():
+    """
+    Load every configured sheet cache (and the indexes built with it) in parallel,
+    then mark the process ready. A failed load is recorded and left to the first request.
+    """
+    tasks = {}
+    if os.environ.get('ITEMS_SHEET_ID'):
+        tasks['items'] = _get_items_catalog
+    if os.environ.get('VENDORS_SHEET_ID'):
+        tasks['vendors'] = _get_vendors_catalog
+    history_sheet_id = os.environ.get('HISTORY_SHEET_ID')
+    if history_sheet_id:
+        tasks['history'] = lambda: _ensure_history(history_sheet_id)
+
+    def run(name, task):
+        try:
+            task()
+            with _warmup_lock:
+                _warmup_state['loaded'].append(name)
+        except Exception as e:
+            with _warmup_lock:
+                _warmup_state['errors'][name] = str(e)
+            print(f"Error warming up {name} cache: {e}")
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=run, args=(name, task), name=f"warmup-{name}", daemon=True)
+               for name, task in tasks.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with _warmup_lock:
+        _warmup_state['seconds'] = round(time.monotonic() - started, 3)
+        _warmup_state['ready'] = True
+
+def start_warmup():
+    """
+    Start warming the sheet caches on a background thread (once per process).
+    """
+    global _warmup_thread
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _warmup_state['started_at'] = datetime.now().isoformat(sep=' ', timespec='seconds')
+            _warmup_thread = threading.Thread(target=_warm_up, name='sheets-warmup', daemon=True)
+            _warmup_thread.start()
+
+def is_ready():
+    """
+    True once the startup warm-up has finished (whether or not every load succeeded).
+    """
+    with _warmup_lock:
+        return _warmup_state['ready']
+
+def get_warmup_stats():
+    with _warmup_lock:
+        return dict(_warmup_state, loaded=list(_warmup_state['loaded']), errors=dict(_warmup_state['errors']))
@@ -0,0 +1,139 @@
+"""
+Columnar copy of the shipping history for grouped statistics.
+Quantity, per-unit offset cost, weight used and timestamp live in parallel typed
+arrays, and item, vendor and receiving location as integer codes into per-column
+category lists. A group-by is then a few numpy passes over the arrays (bincount and
+reduceat).
+"""
+from array import array
+
+import numpy
+
+CATEGORY_FIELDS = ('item_name', 'vendor', 'receiving')
+
+NAN = float('nan')
+
+
+def _float(value, default):
+    if value is None or value == '':
+        return default
+    try:
+        return float(value)
+    except Exception:
+        return default
+
+
+class HistoryColumns:
+    """
+    One entry per history row, in sheet order. Rows without an item name keep their
+    place with category code -1 and are left out of every group.
+    Quantity falls back to 1 and the offset cost is flagged missing when not a number,
+    as for the shipping averages; weight used and epoch are NaN when missing.
+    """
+
+    def __init__(self):
+        self.quantity = array('d')
+        self.offset_cost = array('d')
+        self.has_offset_cost = array('b')
+        self.weight_used = array('d')
+        self.epoch = array('d')
+        self.codes = {field: array('q') for field in CATEGORY_FIELDS}
+        self.categories = {field: [] for field in CATEGORY_FIELDS}
+        self._category_codes = {field: {} for field in CATEGORY_FIELDS}
+
+    def __len__(self):
+        return len(self.quantity)
+
+    def _code(self, field, value):
+        codes = self._category_codes[field]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self.categories[field])
+            self.categories[field].append(value)
+        return code
+
+    def append(self, record):
+        """
+        Add a HistoryRecord (or None for a row without an item name) after the last row.
+        """
+        if record is None:
+            self.quantity.append(1.0)
+            self.offset_cost.append(NAN)
+            self.has_offset_cost.append(0)
+            self.weight_used.append(NAN)
+            self.epoch.append(NAN)
+            for field in CATEGORY_FIELDS:
+                self.codes[field].append(-1)
+            return
+        offset_cost = _float(record.per_unit_cost_offset, None)
+        self.quantity.append(_float(record.quantity, 1.0))
+        self.offset_cost.append(NAN if offset_cost is None else offset_cost)
+        self.has_offset_cost.append(offset_cost is not None)
+        self.weight_used.append(_float(record.weight_used, NAN))
+        self.epoch.append(NAN if record.epoch is None else float(record.epoch))
+        for field in CATEGORY_FIELDS:
+            self.codes[field].append(self._code(field, getattr(record, field)))
+
+    def delete(self, index):
+        """
+        Drop the row at a 0-based index.
+        """
+        for column in (self.quantity, self.offset_cost, self.has_offset_cost, self.weight_used, self.epoch):
+            del column[index]
+        for field in CATEGORY_FIELDS:
+            del self.codes[field][index]
+
+    def group_stats(self, by):
+        """
+        Statistics per distinct combination of the category fields in by (a tuple drawn from
+        CATEGORY_FIELDS), keyed by the tuple of values in first-seen order. Each group has
+        the row count, the index of its first row, the quantity sum and quantity-weighted
+        offset cost sum over rows with a numeric offset cost, the sum and count of numeric
+        weights used, and the latest epoch (NaN if no timestamp parsed).
+        """
+        by = tuple(by)
+        groups = self._group_stats(by)
+        return {tuple(self.categories[field][code] for field, code in zip(by, key)): stats for key, stats in groups}
+
+    def _group_stats(self, by):
+        item_codes = numpy.frombuffer(self.codes['item_name'], dtype=numpy.int64) if len(self) else numpy.zeros(0, numpy.int64)
+        rows = numpy.flatnonzero(item_codes >= 0)
+        if not len(rows):
+            return []
+        columns = [numpy.frombuffer(self.codes[field], dtype=numpy.int64)[rows] for field in by]
+        keys = numpy.zeros(len(rows), dtype=numpy.int64)
+        for field, column in zip(by, columns):
+            keys = keys * len(self.categories[field]) + column
+        _, first, inverse = numpy.unique(keys, return_index=True, return_inverse=True)
+        size = len(first)
+
+        quantity = numpy.frombuffer(self.quantity, dtype=numpy.float64)[rows]
+        offset_cost = numpy.frombuffer(self.offset_cost, dtype=numpy.float64)[rows]
+        has_offset_cost = numpy.frombuffer(self.has_offset_cost, dtype=numpy.int8)[rows] != 0
+        weight_used = numpy.frombuffer(self.weight_used, dtype=numpy.float64)[rows]
+        epoch = numpy.frombuffer(self.epoch, dtype=numpy.float64)[rows]
+        has_weight = ~numpy.isnan(weight_used)
+
+        counts = numpy.bincount(inverse, minlength=size)
+        quantity_sums = numpy.bincount(inverse, weights=numpy.where(has_offset_cost, quantity, 0.0), minlength=size)
+        offset_cost_sums = numpy.bincount(inverse, weights=numpy.where(has_offset_cost, offset_cost * quantity, 0.0), minlength=size)
+        weight_sums = numpy.bincount(inverse, weights=numpy.where(has_weight, weight_used, 0.0), minlength=size)
+        weight_counts = numpy.bincount(inverse, weights=has_weight, minlength=size)
+        # Latest epoch per group: sort rows by group, then one fmax.reduceat over each group's run
+        order = numpy.argsort(inverse, kind='stable')
+        starts = numpy.concatenate(([0], numpy.cumsum(counts)[:-1]))
+        last_epochs = numpy.fmax.reduceat(epoch[order], starts)
+
+        groups = []
+        for group in numpy.argsort(first):
+            first_row = first[group]
+            groups.append((tuple(int(column[first_row]) for column in columns), {
+                'count': int(counts[group]),
+                'first_index': int(rows[first_row]),
+                'quantity_sum': float(quantity_sums[group]),
+                'offset_cost_sum': float(offset_cost_sums[group]),
+                'weight_used_sum': float(weight_sums[group]),
+                'weight_used_count': int(weight_counts[group]),
+                'last_epoch': float(last_epochs[group]),
+            }))
+        return groups
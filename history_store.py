@@ -0,0 +1,613 @@
+"""
+In-memory copy of the shipping history sheet.
+Keeps each row as a compact converted record plus the identity of the raw row,
+so the sheet can be synced incrementally: only rows after the last ingested one need to be read.
+"""
+import sys
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timezone
+
+from gspread.utils import numericise_all
+
+from history_columns import HistoryColumns
+from sheets_mirror import normalize
+
+HISTORY_COLUMNS = ['Item Name', 'Per-Unit Shipping Cost', 'Per-Unit Shipping Cost (Offset)', 'Timestamp', 'Quantity', 'Vendor', 'UPS', 'Weight Used', 'PO', 'Receiving']
+
+# HistoryRecord attribute for each column, in HISTORY_COLUMNS order, and the value a
+# record gets when the sheet has no such column
+RECORD_FIELDS = ('item_name', 'per_unit_cost', 'per_unit_cost_offset', 'timestamp', 'quantity', 'vendor', 'ups', 'weight_used', 'po', 'receiving')
+_FIELD_BY_COLUMN = dict(zip(HISTORY_COLUMNS, RECORD_FIELDS))
+_MISSING_COLUMN_DEFAULTS = ('', 0, 0, '', 1, '', '', '', '', '')
+
+# Columns with few distinct values, shared between rows through sys.intern
+_INTERNED_COLUMNS = {'Item Name', 'Vendor', 'UPS', 'Receiving'}
+_INTERNED_INDEXES = [i for i, column in enumerate(HISTORY_COLUMNS) if column in _INTERNED_COLUMNS]
+
+
+def timestamp_epoch(value):
+    """
+    Integer seconds since the epoch for a history timestamp (naive times read as UTC),
+    or None if it is not an ISO date/time.
+    """
+    if isinstance(value, datetime):
+        moment = value
+    elif isinstance(value, str):
+        try:
+            moment = datetime.fromisoformat(value.strip())
+        except ValueError:
+            return None
+    else:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+def _timestamp_text(epoch):
+    """
+    The sheet's own timestamp format ('YYYY-MM-DD HH:MM:SS') for an epoch from timestamp_epoch.
+    """
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(epoch))
+
+
+def _time_key(epoch):
+    """
+    Ordering key for an epoch; timestamps that did not parse sort before every real time.
+    """
+    return float('-inf') if epoch is None else epoch
+
+
+class HistoryRecord:
+    """
+    One converted history row: numbers parsed once at ingest and item, vendor, UPS and
+    receiving strings interned. Fields are attributes (see RECORD_FIELDS) plus epoch, the
+    timestamp parsed once by timestamp_epoch; record['Item Name'] and record.get('Vendor', '')
+    also work, so records stand in for the old row dicts.
+    The timestamp text is only kept when it is not in the sheet's own format; otherwise it
+    is rebuilt from epoch on access.
+    """
+    __slots__ = tuple(field for field in RECORD_FIELDS if field != 'timestamp') + ('_timestamp', 'epoch')
+
+    def __init__(self, item_name, per_unit_cost, per_unit_cost_offset, timestamp, quantity, vendor, ups, weight_used, po, receiving):
+        self.item_name = item_name
+        self.per_unit_cost = per_unit_cost
+        self.per_unit_cost_offset = per_unit_cost_offset
+        self.quantity = quantity
+        self.vendor = vendor
+        self.ups = ups
+        self.weight_used = weight_used
+        self.po = po
+        self.receiving = receiving
+        self.epoch = timestamp_epoch(timestamp)
+        self._timestamp = None if self.epoch is not None and timestamp == _timestamp_text(self.epoch) else timestamp
+
+    @property
+    def timestamp(self):
+        if self._timestamp is None:
+            return _timestamp_text(self.epoch)
+        return self._timestamp
+
+    def __getitem__(self, column):
+        field = _FIELD_BY_COLUMN.get(column)
+        if field is None:
+            raise KeyError(column)
+        return getattr(self, field)
+
+    def get(self, column, default=None):
+        field = _FIELD_BY_COLUMN.get(column)
+        return default if field is None else getattr(self, field)
+
+    def keys(self):
+        return list(HISTORY_COLUMNS)
+
+    def __eq__(self, other):
+        if not isinstance(other, HistoryRecord):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in RECORD_FIELDS)
+
+    def __repr__(self):
+        return f"HistoryRecord({', '.join(repr(getattr(self, field)) for field in RECORD_FIELDS)})"
+
+
+def _intern_cells(values):
+    """
+    Intern the low-cardinality cells of a HISTORY_COLUMNS-ordered value list in place.
+    """
+    for index in _INTERNED_INDEXES:
+        if isinstance(values[index], str):
+            values[index] = sys.intern(values[index])
+    return values
+
+
+def _cell(row, index):
+    if index is None or index >= len(row):
+        return ''
+    value = row[index]
+    return '' if value is None else str(value)
+
+
+def _trim(row):
+    """
+    Drop trailing empty cells, matching what the Sheets API returns for a row.
+    """
+    row = ['' if value is None else str(value) for value in row]
+    while row and row[-1] == '':
+        row.pop()
+    return row
+
+
+def _average_terms(record):
+    """
+    Quantity-weighted terms one record contributes to its (item, vendor) average,
+    or None if its offset cost is not a number.
+    """
+    try:
+        quantity = float(record.quantity)
+    except Exception:
+        quantity = 1
+    try:
+        offset_cost = float(record.per_unit_cost_offset)
+    except Exception:
+        return None
+    return offset_cost * quantity, quantity
+
+
+def add_to_averages(aggregates, record, sign=1):
+    """
+    Add (sign=1) or remove (sign=-1) one record from a (item name, vendor) -> running sums map.
+    """
+    key = (record.item_name, record.vendor)
+    entry = aggregates.get(key)
+    if entry is None:
+        if sign < 0:
+            return
+        # UPS comes from the first record seen for the key
+        entry = aggregates[key] = {'offset_cost_sum': 0.0, 'quantity_sum': 0.0, 'count': 0, 'UPS': record.ups}
+    entry['count'] += sign
+    terms = _average_terms(record)
+    if terms is not None:
+        entry['offset_cost_sum'] += sign * terms[0]
+        entry['quantity_sum'] += sign * terms[1]
+    if entry['count'] <= 0:
+        del aggregates[key]
+
+
+def averages_list(aggregates):
+    """
+    Dump running sums as the rows of the item shipping averages panel.
+    """
+    items = []
+    for (item_name, vendor), data in aggregates.items():
+        if data['quantity_sum'] > 0:
+            avg_offset_cost = data['offset_cost_sum'] / data['quantity_sum']
+        else:
+            avg_offset_cost = 0.0
+        items.append({
+            "name": item_name,
+            "vendor": vendor,
+            "avg_per_unit_shipping_offset": avg_offset_cost,
+            "UPS": data['UPS']
+        })
+    return items
+
+
+def _valid_weight(record):
+    weight = record.weight_used
+    if weight in (None, '', 'N/A'):
+        return None
+    try:
+        return float(weight)
+    except Exception:
+        return None
+
+
+def last_weight_keys(record):
+    """
+    Index keys a record is filed under: (item, vendor) and (item, None) for any vendor, both normalized.
+    """
+    item = normalize(record.item_name)
+    return ((item, normalize(record.vendor)), (item, None))
+
+
+def add_to_last_weights(index, record, keys=None):
+    """
+    Record a row's weight in a key -> (time key, weight) index if it is the newest valid
+    weight for the key, comparing parsed epochs. On equal times the earlier row wins, as in last_weight_used.
+    Only the given keys are touched if keys is not None.
+    """
+    weight = _valid_weight(record)
+    if weight is None:
+        return
+    timestamp = _time_key(record.epoch)
+    for key in last_weight_keys(record):
+        if keys is not None and key not in keys:
+            continue
+        current = index.get(key)
+        if current is None or timestamp > current[0]:
+            index[key] = (timestamp, weight)
+
+
+def add_to_vendor_items(index, record, sign=1):
+    """
+    Add (sign=1) or remove (sign=-1) one record from a vendor -> {'counts', 'names'} index,
+    where names is the vendor's distinct item names kept sorted on insert and counts
+    the number of rows behind each name. Vendors are keyed stripped, as item_names_by_vendor matches them.
+    """
+    name = record.item_name
+    vendor = str(record.vendor).strip()
+    entry = index.get(vendor)
+    if entry is None:
+        if sign < 0:
+            return
+        entry = index[vendor] = {'counts': {}, 'names': []}
+    count = entry['counts'].get(name, 0) + sign
+    if count > 0:
+        if name not in entry['counts']:
+            insort(entry['names'], name, key=str)
+        entry['counts'][name] = count
+    elif name in entry['counts']:
+        del entry['counts'][name]
+        names = entry['names']
+        i = bisect_left(names, str(name), key=str)
+        while names[i] != name:
+            i += 1
+        del names[i]
+        if not names:
+            del index[vendor]
+
+
+class HistoryStore:
+    """
+    History records in sheet order (None for rows without an item name) with the identity
+    of each raw row where the record does not already carry it, running per-(item, vendor) sums for the shipping averages, the last valid
+    weight used per item and (item, vendor), and each vendor's sorted item names.
+    Sheet row numbers are 1-indexed with the header on row 1. generation changes
+    whenever existing rows are replaced or removed (anything but an append).
+    """
+
+    def __init__(self):
+        self.header = None
+        self._columns = None
+        self._fingerprints = []
+        self._records = []
+        # Records with a parsed timestamp in time order (sheet order within a second), with their epochs
+        self._time_epochs = []
+        self._time_records = []
+        self.aggregates = {}
+        self.last_weights = {}
+        self.vendor_items = {}
+        self.generation = 0
+
+    @property
+    def loaded(self):
+        return self.header is not None
+
+    @property
+    def last_row_number(self):
+        """
+        Sheet row number of the last ingested row (1 when only the header is loaded).
+        """
+        return len(self._records) + 1
+
+    @property
+    def width(self):
+        return max(len(self.header or []), len(HISTORY_COLUMNS))
+
+    def load(self, values):
+        """
+        Replace the store with a full sheet read (header row first).
+        """
+        values = list(values)
+        self.header = [str(h) for h in values[0]] if values else list(HISTORY_COLUMNS)
+        # Cell index of each history column (the last one if a header repeats, as in a dict)
+        positions = {column: index for index, column in enumerate(self.header)}
+        self._columns = [positions.get(column) for column in HISTORY_COLUMNS]
+        self._fingerprints = []
+        self._records = []
+        self._time_epochs = []
+        self._time_records = []
+        self.last_weights = {}
+        self.vendor_items = {}
+        self.generation += 1
+        self._ingest(values[1:], aggregate=False, index_time=False)
+        # Sort once instead of inserting row by row; the sort is stable so ties keep sheet order
+        self._time_records = sorted((record for record in self._records if record is not None and record.epoch is not None),
+                                    key=lambda record: record.epoch)
+        self._time_epochs = [record.epoch for record in self._time_records]
+        # One grouped pass over a columnar copy instead of updating the sums row by row; the copy
+        # is only needed for this, so it is not kept
+        columns = HistoryColumns()
+        for record in self._records:
+            columns.append(record)
+        self.aggregates = {}
+        for key, stats in columns.group_stats(('item_name', 'vendor')).items():
+            self.aggregates[key] = {
+                'offset_cost_sum': stats['offset_cost_sum'], 'quantity_sum': stats['quantity_sum'],
+                'count': stats['count'], 'UPS': self._records[stats['first_index']].ups,
+            }
+
+    def extend(self, rows):
+        """
+        Ingest rows that follow the last ingested row.
+        """
+        self._ingest(rows)
+
+    def _ingest(self, rows, aggregate=True, index_time=True):
+        for row in rows:
+            row = _trim(row)
+            values = self._column_values(row)
+            record = HistoryRecord(*values) if values[0] else None
+            self._fingerprints.append(self._stored_fingerprint(row, record))
+            self._records.append(record)
+            if record is not None:
+                if aggregate:
+                    add_to_averages(self.aggregates, record)
+                if index_time and record.epoch is not None:
+                    # Later rows go after equal times; new rows usually land at the end
+                    index = bisect_right(self._time_epochs, record.epoch)
+                    self._time_epochs.insert(index, record.epoch)
+                    self._time_records.insert(index, record)
+                add_to_last_weights(self.last_weights, record)
+                add_to_vendor_items(self.vendor_items, record)
+
+    def delete(self, row_numbers):
+        """
+        Drop the given sheet rows, mirroring a delete on the sheet.
+        """
+        self.generation += 1
+        touched = set()
+        weight_keys = set()
+        for row_number in sorted(set(row_numbers), reverse=True):
+            index = row_number - 2
+            if 0 <= index < len(self._records):
+                record = self._records[index]
+                del self._fingerprints[index]
+                del self._records[index]
+                if record is not None:
+                    self._unindex_time(record)
+                    add_to_averages(self.aggregates, record, sign=-1)
+                    add_to_vendor_items(self.vendor_items, record, sign=-1)
+                    touched.add((record.item_name, record.vendor))
+                    weight_keys.update(last_weight_keys(record))
+        # A key that lost its first row takes its UPS flag from the next one
+        touched &= set(self.aggregates)
+        for record in self._records:
+            if not touched:
+                break
+            if record is None:
+                continue
+            key = (record.item_name, record.vendor)
+            if key in touched:
+                self.aggregates[key]['UPS'] = record.ups
+                touched.discard(key)
+        # Rebuild the last weight of every key that lost a row
+        for key in weight_keys:
+            self.last_weights.pop(key, None)
+        if weight_keys:
+            for record in self._records:
+                if record is not None:
+                    add_to_last_weights(self.last_weights, record, weight_keys)
+
+    def _unindex_time(self, record):
+        if record.epoch is None:
+            return
+        index = bisect_left(self._time_epochs, record.epoch)
+        while self._time_records[index] is not record:
+            index += 1
+        del self._time_epochs[index]
+        del self._time_records[index]
+
+    def fingerprint(self, row_number):
+        """
+        Identity of an ingested row: the header itself, or its item name and timestamp.
+        """
+        if row_number == 1:
+            return ('header', tuple(_trim(self.header or [])))
+        fingerprint = self._fingerprints[row_number - 2]
+        if fingerprint is None:
+            record = self._records[row_number - 2]
+            return (record.item_name, record.timestamp)
+        return fingerprint
+
+    def row_fingerprint(self, row):
+        """
+        Item name and timestamp of a data row, the two cells written verbatim as text.
+        """
+        header = self.header or HISTORY_COLUMNS
+        name_index = header.index('Item Name') if 'Item Name' in header else 0
+        timestamp_index = header.index('Timestamp') if 'Timestamp' in header else None
+        return (_cell(row, name_index), _cell(row, timestamp_index))
+
+    def _stored_fingerprint(self, row, record):
+        """
+        What to keep as an ingested row's identity: None when it is just the record's item
+        name and timestamp (both kept as text), else the fingerprint itself.
+        """
+        fingerprint = self.row_fingerprint(row)
+        if record is not None and fingerprint == (record.item_name, record.timestamp):
+            return None
+        return fingerprint
+
+    def matches(self, row_number, row):
+        """
+        True if a freshly read row is the same row that was ingested at row_number.
+        """
+        if row_number == 1:
+            return ('header', tuple(_trim(row))) == self.fingerprint(1)
+        return self.row_fingerprint(row) == self.fingerprint(row_number)
+
+    def records(self):
+        """
+        History records in sheet order, skipping rows without an item name.
+        """
+        return [record for record in self._records if record is not None]
+
+    def numbered_records(self, start=0):
+        """
+        (sheet row number, record) pairs for ingested rows from data index start onwards.
+        """
+        return [(index + 2, self._records[index]) for index in range(start, len(self._records)) if self._records[index] is not None]
+
+    def averages(self, extra_records=()):
+        """
+        Quantity-weighted average offset cost per (item, vendor), folding in extra
+        records (e.g. rows not yet written) without touching the stored sums.
+        """
+        aggregates = self.aggregates
+        if extra_records:
+            aggregates = {key: dict(entry) for key, entry in aggregates.items()}
+            for record in extra_records:
+                if record is not None:
+                    add_to_averages(aggregates, record)
+        return averages_list(aggregates)
+
+    def records_between(self, start=None, end=None):
+        """
+        Records with start <= timestamp < end in time order, found by binary search. Bounds
+        are epoch seconds, datetimes or ISO strings (naive read as UTC); None leaves that side
+        open. Rows whose timestamp does not parse are never included.
+        """
+        low = 0 if start is None else bisect_left(self._time_epochs, _epoch_bound(start))
+        high = len(self._time_epochs) if end is None else bisect_left(self._time_epochs, _epoch_bound(end))
+        return self._time_records[low:high]
+
+    def last_weight(self, item_name, vendor=None, extra_records=()):
+        """
+        Most recent valid weight used for an item (optionally for one vendor) from the
+        index, with extra records (e.g. rows not yet written) counted as later rows.
+        """
+        key = (normalize(item_name), normalize(vendor) if vendor else None)
+        entry = self.last_weights.get(key)
+        if extra_records:
+            index = {key: entry} if entry is not None else {}
+            for record in extra_records:
+                if record is not None:
+                    add_to_last_weights(index, record, (key,))
+            entry = index.get(key)
+        return None if entry is None else entry[1]
+
+    def item_names_by_vendor(self, vendor, extra_records=()):
+        """
+        Sorted distinct item names recorded for a vendor, including extra records.
+        """
+        entry = self.vendor_items.get(vendor)
+        names = list(entry['names']) if entry is not None else []
+        for record in extra_records:
+            if record is not None and str(record.vendor).strip() == vendor and record.item_name not in names:
+                insort(names, record.item_name, key=str)
+        return names
+
+    def __len__(self):
+        return len(self._records)
+
+    def _column_values(self, row):
+        """
+        Cells of a raw row in HISTORY_COLUMNS order, converted the way get_all_records
+        would; columns missing from the header get their history record defaults.
+        """
+        columns = self._columns or list(range(len(HISTORY_COLUMNS)))
+        values = _intern_cells([_cell(row, index) for index in columns])
+        values = numericise_all(values, default_blank='')
+        for i, index in enumerate(columns):
+            if index is None:
+                values[i] = _MISSING_COLUMN_DEFAULTS[i]
+        return values
+
+
+def summary_rows(records, label):
+    """
+    One HISTORY_COLUMNS row per (item name, vendor) standing in for the given records, in
+    first-seen order. Quantity is the quantity behind numeric offset costs and the offset
+    cost their quantity-weighted average, so the shipping averages come out the same; the
+    cost column is averaged the same way. Timestamp and weight used come from the newest
+    valid weight (else the newest record), so last-weight lookups are unchanged too.
+    UPS comes from the first record and PO is set to label.
+    """
+    aggregates = {}
+    costs = {}
+    latest = {}
+    for record in records:
+        add_to_averages(aggregates, record)
+        key = (record.item_name, record.vendor)
+        try:
+            quantity = float(record.quantity)
+        except Exception:
+            quantity = 1
+        cost = costs.setdefault(key, [0.0, 0.0])
+        try:
+            cost[0] += float(record.per_unit_cost) * quantity
+            cost[1] += quantity
+        except Exception:
+            pass
+        # Newest valid weight first, then newest record; the earlier record wins ties
+        rank = (_valid_weight(record) is not None, _time_key(record.epoch))
+        if key not in latest or rank > latest[key][0]:
+            latest[key] = (rank, record)
+    rows = []
+    for (item_name, vendor), entry in aggregates.items():
+        quantity = entry['quantity_sum']
+        cost_sum, cost_quantity = costs[(item_name, vendor)]
+        newest = latest[(item_name, vendor)][1]
+        weight = _valid_weight(newest)
+        rows.append([
+            item_name,
+            cost_sum / cost_quantity if cost_quantity > 0 else '',
+            entry['offset_cost_sum'] / quantity if quantity > 0 else '',
+            newest.timestamp,
+            int(quantity) if float(quantity).is_integer() else quantity,
+            vendor,
+            entry['UPS'],
+            '' if weight is None else weight,
+            label,
+            '',
+        ])
+    return rows
+
+
+def _epoch_bound(value):
+    if isinstance(value, (int, float)):
+        return value
+    epoch = timestamp_epoch(value)
+    if epoch is None:
+        raise ValueError(f"Not an ISO date/time: {value!r}")
+    return epoch
+
+
+def history_record_from_row(row):
+    """
+    Convert a history row written in HISTORY_COLUMNS order to a HistoryRecord, or None if it has no item name.
+    """
+    values = ['' if value is None else str(value) for value in row]
+    values += [''] * (len(HISTORY_COLUMNS) - len(values))
+    values = numericise_all(_intern_cells(values[:len(HISTORY_COLUMNS)]), default_blank='')
+    return HistoryRecord(*values) if values[0] else None
+
+
+def last_weight_used(history, item_name, vendor=None):
+    """
+    Most recent valid weight used for an item (optionally filtered by vendor) in a list of history records.
+    """
+    filtered = [r for r in history if r.get('Item Name', '').strip().lower() == item_name.strip().lower()]
+    if vendor:
+        filtered = [r for r in filtered if r.get('Vendor', '').strip().lower() == vendor.strip().lower()]
+    # Newest first by parsed time; the sort is stable so equal times keep row order
+    filtered.sort(key=lambda r: _time_key(r.epoch if isinstance(r, HistoryRecord) else timestamp_epoch(r.get('Timestamp', ''))), reverse=True)
+    for record in filtered:
+        weight = record.get('Weight Used', '')
+        if weight not in (None, '', 'N/A'):
+            try:
+                return float(weight)
+            except Exception:
+                continue
+    return None
+
+
+def item_names_by_vendor(history, vendor):
+    """
+    Sorted, distinct item names recorded for a vendor in a list of history records.
+    """
+    return sorted(list(set(
+        record['Item Name'] for record in history if record.get('Vendor', '').strip() == vendor and record.get('Item Name')
+    )))
@@ -0,0 +1,228 @@
+"""
+Write-behind queue for shipping history rows.
+Rows are appended to a local spool file before they are queued, so rows that
+have not reached Google Sheets yet survive a restart and are replayed on boot.
+A background thread flushes queued rows to the sheet in batches. A batch the
+sheet keeps rejecting outright is set aside in a dead-letter file so the rows
+behind it still get written.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+
+class HistoryWriter:
+    """
+    Background writer that persists history rows through flush(rows), which returns a
+    truthy result on success. flush runs holding flush_lock; then, holding commit_lock,
+    commit(rows, result) applies the written rows locally and the batch leaves the
+    queue, so a reader holding commit_lock sees each row either pending or written,
+    never both, without waiting on the write itself.
+    Delivery is at-least-once: a crash between a successful flush and the
+    spool rewrite replays that batch on the next boot.
+    is_permanent(exc) says whether a flush error will fail the same way on every retry
+    (e.g. a 400 for a malformed row); after max_permanent_failures of those in a row the
+    batch is appended to dead_letter_path (the spool path + '.dead' by default) and dropped.
+    Other failures are retried with backoff indefinitely.
+    """
+
+    def __init__(self, flush, spool_path, batch_size=200, linger=0.5, max_backoff=60.0,
+                 commit=None, flush_lock=None, commit_lock=None,
+                 is_permanent=None, max_permanent_failures=3, dead_letter_path=None):
+        self.flush = flush
+        self.commit = commit
+        self.flush_lock = flush_lock if flush_lock is not None else threading.Lock()
+        self.commit_lock = commit_lock if commit_lock is not None else threading.Lock()
+        self.spool_path = spool_path
+        self.batch_size = batch_size
+        self.linger = linger
+        self.max_backoff = max_backoff
+        self.is_permanent = is_permanent
+        self.max_permanent_failures = max_permanent_failures
+        self.dead_letter_path = dead_letter_path or spool_path + '.dead'
+        self._queue = deque()  # (entry_id, row) in arrival order, not yet written to the sheet
+        self._cond = threading.Condition()
+        self._thread = None
+        self.stats = {'enqueued': 0, 'flushed': 0, 'flushes': 0, 'failures': 0, 'replayed': 0,
+                      'dead_lettered': 0, 'discarded': 0, 'last_error': None}
+
+    def start(self):
+        """
+        Replay any rows left in the spool and start the flush thread.
+        """
+        with self._cond:
+            if self._thread is not None:
+                return
+            # The spool holds every queued row in order, including any enqueued before start
+            queued = set(entry_id for entry_id, _ in self._queue)
+            self._queue = deque(self._read_spool())
+            replayed = sum(1 for entry_id, _ in self._queue if entry_id not in queued)
+            self.stats['replayed'] = replayed
+            if replayed:
+                print(f"Replaying {replayed} spooled shipping history row(s)")
+            self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+            self._thread.start()
+
+    def enqueue(self, rows):
+        """
+        Spool rows to disk and queue them for the sheet.
+        Returns True once the rows are durably spooled, False if the spool write failed.
+        """
+        entries = [(uuid.uuid4().hex, list(row)) for row in rows]
+        if not entries:
+            return True
+        with self._cond:
+            try:
+                with open(self.spool_path, 'a') as f:
+                    for entry_id, row in entries:
+                        f.write(json.dumps({'id': entry_id, 'row': row}) + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+            except Exception as e:
+                print(f"Error spooling shipping history: {e}")
+                return False
+            self._queue.extend(entries)
+            self.stats['enqueued'] += len(entries)
+            self._cond.notify()
+        return True
+
+    def pending_rows(self):
+        """
+        Return the rows that are spooled but not yet written to the sheet, oldest first.
+        """
+        with self._cond:
+            return [row for _, row in self._queue]
+
+    def discard(self, predicate):
+        """
+        Drop queued rows for which predicate(row) is true (e.g. history the user just deleted)
+        and rewrite the spool so they are not replayed either. Returns the number dropped.
+        Call it holding flush_lock, so no batch containing those rows is being written.
+        """
+        with self._cond:
+            kept = deque(entry for entry in self._queue if not predicate(entry[1]))
+            dropped = len(self._queue) - len(kept)
+            if dropped:
+                self._queue = kept
+                self.stats['discarded'] += dropped
+                self._rewrite_spool()
+            return dropped
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self.stats)
+            stats['pending'] = len(self._queue)
+        return stats
+
+    def _run(self):
+        backoff = 1.0
+        permanent_failures = 0
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+            # Give concurrent requests a moment to add rows to the same batch
+            time.sleep(self.linger)
+            with self.flush_lock:
+                # Taken under flush_lock, as discard is, so the batch is still at the head afterwards
+                with self._cond:
+                    batch = list(self._queue)[:self.batch_size]
+                if not batch:
+                    continue
+                rows = [row for _, row in batch]
+                result, error, permanent = None, None, False
+                try:
+                    result = self.flush(rows)
+                except Exception as e:
+                    error = str(e)
+                    permanent = self.is_permanent is not None and self.is_permanent(e)
+                    print(f"Error writing spooled shipping history: {e}")
+                ok = bool(result)
+                permanent_failures = permanent_failures + 1 if permanent else 0
+                dead = permanent_failures >= self.max_permanent_failures
+                with self.commit_lock:
+                    if ok and self.commit is not None:
+                        try:
+                            self.commit(rows, result)
+                        except Exception as e:
+                            # The rows are written; local state catches up on the next sync
+                            print(f"Error applying written shipping history: {e}")
+                    with self._cond:
+                        self.stats['flushes'] += 1
+                        if error is not None:
+                            self.stats['last_error'] = error
+                        if ok:
+                            # Only this thread removes entries, so the batch is still at the head
+                            for _ in batch:
+                                self._queue.popleft()
+                            self.stats['flushed'] += len(batch)
+                            self._rewrite_spool()
+                        else:
+                            self.stats['failures'] += 1
+                            if dead:
+                                dead = self._dead_letter(batch, error)
+                            if dead:
+                                for _ in batch:
+                                    self._queue.popleft()
+                                self.stats['dead_lettered'] += len(batch)
+                                self._rewrite_spool()
+            if ok or dead:
+                backoff = 1.0
+                permanent_failures = 0
+            else:
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+    def _dead_letter(self, batch, error):
+        """
+        Append a batch the sheet keeps rejecting to the dead-letter file, with the last error,
+        for someone to fix and re-enter by hand. Caller holds the lock.
+        Returns False (and the batch stays queued) if the file could not be written.
+        """
+        try:
+            with open(self.dead_letter_path, 'a') as f:
+                for entry_id, row in batch:
+                    f.write(json.dumps({'id': entry_id, 'row': row, 'error': error}) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception as e:
+            print(f"Error writing history dead-letter file: {e}")
+            return False
+        print(f"Moved {len(batch)} shipping history row(s) the sheet keeps rejecting to {self.dead_letter_path}: {error}")
+        return True
+
+    def _read_spool(self):
+        entries = []
+        if not os.path.exists(self.spool_path):
+            return entries
+        with open(self.spool_path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    entries.append((record['id'], record['row']))
+                except (ValueError, KeyError):
+                    # A torn last line from a crash mid-write
+                    continue
+        return entries
+
+    def _rewrite_spool(self):
+        """
+        Replace the spool with the rows still queued. Caller holds the lock.
+        """
+        try:
+            if not self._queue:
+                if os.path.exists(self.spool_path):
+                    os.remove(self.spool_path)
+                return
+            tmp_path = self.spool_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                for entry_id, row in self._queue:
+                    f.write(json.dumps({'id': entry_id, 'row': row}) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.spool_path)
+        except Exception as e:
+            print(f"Error rewriting history spool: {e}")
@@ -0,0 +1,129 @@
+"""
+Client-side rate limiting for Google Sheets API calls.
+Reads and writes draw from separate token buckets sized to the per-minute
+quotas, and calls rejected with 429 are retried with jittered exponential
+backoff. A 5xx is retried only for idempotent calls: the server may already
+have applied a write before failing, so repeating it could apply it twice.
+"""
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Refills at rate tokens per second up to capacity; acquire() blocks until a token is free.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take one token, sleeping until one is available. Returns the seconds spent waiting.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return waited
+                delay = (1.0 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def drain(self):
+        """
+        Empty the bucket, e.g. after the server says the quota is used up.
+        """
+        with self._lock:
+            self._tokens = 0.0
+            self._updated = time.monotonic()
+
+
+class RateLimiter:
+    """
+    Separate read and write budgets (requests per minute) with retry on quota and server errors.
+    call(kind, operation, error_status) runs operation(); error_status(exc) returns the HTTP
+    status of a failed call, or None if the error should not be retried. Pass idempotent=False
+    for calls that must not be repeated after a server error (429s are still retried, since
+    the request was rejected before anything was applied).
+    """
+
+    def __init__(self, read_per_minute=60, write_per_minute=60, burst=10, max_retries=5,
+                 base_backoff=1.0, max_backoff=32.0):
+        self.buckets = {
+            'read': TokenBucket(read_per_minute / 60.0, min(burst, read_per_minute)),
+            'write': TokenBucket(write_per_minute / 60.0, min(burst, write_per_minute)),
+        }
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self.stats = {kind: {
+            'calls': 0, 'throttled': 0, 'throttled_seconds': 0.0, 'retries': 0, 'backoff_seconds': 0.0,
+            'rate_limited': 0, 'server_errors': 0, 'failures': 0,
+        } for kind in self.buckets}
+
+    @staticmethod
+    def is_retryable(status, idempotent=True):
+        if status is None:
+            return False
+        return status == 429 or (idempotent and status >= 500)
+
+    def backoff(self, attempt, retry_after=None):
+        """
+        Full-jitter exponential backoff for a retry attempt (0-based), at least retry_after seconds.
+        """
+        delay = random.uniform(0, min(self.max_backoff, self.base_backoff * (2 ** attempt)))
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+    def call(self, kind, operation, error_status, retry_after=None, idempotent=True):
+        bucket = self.buckets[kind]
+        attempt = 0
+        while True:
+            waited = bucket.acquire()
+            with self._lock:
+                stats = self.stats[kind]
+                stats['calls'] += 1
+                if waited > 0:
+                    stats['throttled'] += 1
+                    stats['throttled_seconds'] += waited
+            try:
+                return operation()
+            except Exception as e:
+                status = error_status(e)
+                if not self.is_retryable(status):
+                    raise
+                with self._lock:
+                    stats['rate_limited' if status == 429 else 'server_errors'] += 1
+                    if attempt >= self.max_retries or not self.is_retryable(status, idempotent):
+                        stats['failures'] += 1
+                        raise
+                if status == 429:
+                    # The server-side quota is spent; stop other threads from piling on too
+                    bucket.drain()
+                delay = self.backoff(attempt, retry_after(e) if retry_after is not None else None)
+                with self._lock:
+                    stats['retries'] += 1
+                    stats['backoff_seconds'] += delay
+                time.sleep(delay)
+                attempt += 1
+
+    def get_stats(self):
+        with self._lock:
+            stats = {kind: dict(values) for kind, values in self.stats.items()}
+        for kind, values in stats.items():
+            values['throttled_seconds'] = round(values['throttled_seconds'], 3)
+            values['backoff_seconds'] = round(values['backoff_seconds'], 3)
+            values['per_minute'] = round(self.buckets[kind].rate * 60.0, 1)
+        return stats
@@ -0,0 +1,295 @@
+"""
+Local SQLite mirror of the items, vendors and shipping history sheets.
+Google Sheets stays the system of record; the mirror is refreshed by a
+background sync and serves reads as local indexed queries.
+"""
+import sqlite3
+import threading
+import time
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS items (
+    row_num INTEGER PRIMARY KEY,
+    name,
+    name_norm TEXT NOT NULL,
+    weight
+);
+CREATE INDEX IF NOT EXISTS idx_items_name ON items (name_norm);
+
+CREATE TABLE IF NOT EXISTS vendors (
+    row_num INTEGER PRIMARY KEY,
+    name,
+    name_norm TEXT NOT NULL,
+    zip TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_vendors_name ON vendors (name_norm);
+
+CREATE TABLE IF NOT EXISTS history (
+    row_num INTEGER PRIMARY KEY,
+    item_name,
+    item_norm TEXT NOT NULL,
+    per_unit_cost,
+    per_unit_cost_offset,
+    timestamp,
+    quantity,
+    vendor,
+    vendor_norm TEXT NOT NULL,
+    ups,
+    weight_used,
+    po,
+    receiving
+);
+CREATE INDEX IF NOT EXISTS idx_history_item_vendor ON history (item_norm, vendor_norm, timestamp);
+CREATE INDEX IF NOT EXISTS idx_history_vendor ON history (vendor_norm);
+CREATE INDEX IF NOT EXISTS idx_history_po ON history (po);
+CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history (timestamp);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value
+);
+'''
+
+HISTORY_FIELDS = [
+    ('item_name', 'Item Name'),
+    ('per_unit_cost', 'Per-Unit Shipping Cost'),
+    ('per_unit_cost_offset', 'Per-Unit Shipping Cost (Offset)'),
+    ('timestamp', 'Timestamp'),
+    ('quantity', 'Quantity'),
+    ('vendor', 'Vendor'),
+    ('ups', 'UPS'),
+    ('weight_used', 'Weight Used'),
+    ('po', 'PO'),
+    ('receiving', 'Receiving'),
+]
+
+
+def normalize(value):
+    return str(value).lower().strip()
+
+
+def _history_params(row_num, record):
+    item_name = record.get('Item Name', '')
+    vendor = record.get('Vendor', '')
+    return (row_num, item_name, normalize(item_name),
+            record.get('Per-Unit Shipping Cost', 0), record.get('Per-Unit Shipping Cost (Offset)', 0),
+            record.get('Timestamp', ''), record.get('Quantity', 1), vendor, normalize(vendor),
+            record.get('UPS', ''), record.get('Weight Used', ''), record.get('PO', ''), record.get('Receiving', ''))
+
+
+class SheetsMirror:
+    """
+    SQLite tables mirroring the three sheets. Row numbers follow the sheet so
+    ordering matches what get_all_records would return.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            if path != ':memory:':
+                self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SCHEMA)
+            self._conn.commit()
+
+    # -- sync state --
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row['value'] if row is not None else default
+
+    def set_meta(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    @property
+    def synced(self):
+        """
+        True once a full sync has completed (persists across restarts).
+        """
+        return self.get_meta('synced_at') is not None
+
+    def mark_synced(self):
+        self.set_meta('synced_at', time.time())
+
+    # -- items --
+
+    def replace_items(self, items):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM items')
+            self._conn.executemany(
+                'INSERT INTO items (row_num, name, name_norm, weight) VALUES (?, ?, ?, ?)',
+                [(i + 2, item['Item'], normalize(item['Item']), item['Weight']) for i, item in enumerate(items)])
+
+    def add_item(self, name, weight):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT INTO items (row_num, name, name_norm, weight) VALUES ((SELECT COALESCE(MAX(row_num), 1) + 1 FROM items), ?, ?, ?)',
+                (name, normalize(name), weight))
+
+    def remove_item(self, name):
+        """
+        Remove the first item with this normalized name. Returns True if one was removed.
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                'DELETE FROM items WHERE row_num = (SELECT row_num FROM items WHERE name_norm = ? ORDER BY row_num LIMIT 1)',
+                (normalize(name),))
+            return cursor.rowcount > 0
+
+    def items(self):
+        with self._lock:
+            rows = self._conn.execute('SELECT name, weight FROM items ORDER BY row_num').fetchall()
+        return [{'Item': row['name'], 'Weight': row['weight']} for row in rows]
+
+    def has_item(self, name):
+        with self._lock:
+            row = self._conn.execute('SELECT 1 FROM items WHERE name_norm = ? LIMIT 1', (normalize(name),)).fetchone()
+        return row is not None
+
+    def item_weight(self, name):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT weight FROM items WHERE name_norm = ? ORDER BY row_num LIMIT 1', (normalize(name),)).fetchone()
+        return None if row is None else row['weight']
+
+    # -- vendors --
+
+    def replace_vendors(self, vendors):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM vendors')
+            self._conn.executemany(
+                'INSERT INTO vendors (row_num, name, name_norm, zip) VALUES (?, ?, ?, ?)',
+                [(i + 2, v['vendor'], normalize(v['vendor']), v['zip']) for i, v in enumerate(vendors)])
+
+    def add_vendor(self, name, zip_code):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT INTO vendors (row_num, name, name_norm, zip) VALUES ((SELECT COALESCE(MAX(row_num), 1) + 1 FROM vendors), ?, ?, ?)',
+                (name, normalize(name), str(zip_code)))
+
+    def has_vendor(self, name, zip_code):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT 1 FROM vendors WHERE name_norm = ? AND TRIM(zip) = ? LIMIT 1',
+                (normalize(name), str(zip_code).strip())).fetchone()
+        return row is not None
+
+    def vendors(self):
+        with self._lock:
+            rows = self._conn.execute('SELECT name, zip FROM vendors ORDER BY row_num').fetchall()
+        return [{'vendor': row['name'], 'zip': row['zip']} for row in rows]
+
+    # -- history --
+
+    def replace_history(self, numbered_records):
+        """
+        Replace the history table with (sheet row number, record) pairs.
+        """
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM history')
+            self._insert_history(numbered_records)
+
+    def append_history(self, numbered_records):
+        with self._lock, self._conn:
+            self._insert_history(numbered_records)
+
+    def add_history(self, records):
+        """
+        Append records after the last history row (for when SQLite is the primary store).
+        """
+        with self._lock, self._conn:
+            next_row = self._conn.execute('SELECT COALESCE(MAX(row_num), 1) + 1 FROM history').fetchone()[0]
+            self._insert_history([(next_row + i, record) for i, record in enumerate(records)])
+
+    def delete_history(self, item_name, vendor=None):
+        """
+        Delete history rows for an item (and vendor, if not None). Returns the number removed.
+        """
+        with self._lock, self._conn:
+            if vendor is None:
+                cursor = self._conn.execute('DELETE FROM history WHERE item_norm = ?', (normalize(item_name),))
+            else:
+                cursor = self._conn.execute(
+                    'DELETE FROM history WHERE item_norm = ? AND vendor_norm = ?', (normalize(item_name), normalize(vendor)))
+            return cursor.rowcount
+
+    def history(self):
+        with self._lock:
+            rows = self._conn.execute('SELECT * FROM history ORDER BY row_num').fetchall()
+        return [self._history_record(row) for row in rows]
+
+    def history_count(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM history').fetchone()[0]
+
+    def averages(self):
+        """
+        Quantity-weighted average offset cost per (item, vendor) via one GROUP BY, in first-seen order.
+        The UPS flag is taken from each group's first row (SQLite bare column with MIN).
+        """
+        with self._lock:
+            rows = self._conn.execute('''
+                SELECT item_name, vendor, ups, MIN(row_num) AS first_row,
+                       SUM(CASE WHEN numeric_offset THEN offset * qty ELSE 0 END) AS offset_cost_sum,
+                       SUM(CASE WHEN numeric_offset THEN qty ELSE 0 END) AS quantity_sum
+                FROM (SELECT row_num, item_name, vendor, ups, per_unit_cost_offset AS offset,
+                             typeof(per_unit_cost_offset) IN ('integer', 'real') AS numeric_offset,
+                             CASE WHEN typeof(quantity) IN ('integer', 'real') THEN quantity ELSE 1 END AS qty
+                      FROM history WHERE item_name IS NOT NULL AND item_name != '')
+                GROUP BY item_name, vendor
+                ORDER BY first_row
+            ''').fetchall()
+        items = []
+        for row in rows:
+            quantity_sum = row['quantity_sum'] or 0.0
+            items.append({
+                "name": row['item_name'],
+                "vendor": row['vendor'],
+                "avg_per_unit_shipping_offset": row['offset_cost_sum'] / quantity_sum if quantity_sum > 0 else 0.0,
+                "UPS": row['ups']
+            })
+        return items
+
+    def last_weight_used(self, item_name, vendor=None):
+        """
+        Most recent valid weight used for an item (optionally for one vendor), newest timestamp first.
+        """
+        query = 'SELECT weight_used FROM history WHERE item_norm = ?'
+        params = [normalize(item_name)]
+        if vendor:
+            query += ' AND vendor_norm = ?'
+            params.append(normalize(vendor))
+        query += ' ORDER BY timestamp DESC, row_num ASC'
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        for row in rows:
+            weight = row['weight_used']
+            if weight not in (None, '', 'N/A'):
+                try:
+                    return float(weight)
+                except Exception:
+                    continue
+        return None
+
+    def item_names_by_vendor(self, vendor):
+        """
+        Sorted distinct item names recorded for a vendor (exact match after stripping).
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT DISTINCT item_name, vendor FROM history WHERE vendor_norm = ?', (normalize(vendor),)).fetchall()
+        return sorted(set(row['item_name'] for row in rows if str(row['vendor']).strip() == vendor and row['item_name']))
+
+    def _insert_history(self, numbered_records):
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO history (row_num, item_name, item_norm, per_unit_cost, per_unit_cost_offset, timestamp, quantity, vendor, vendor_norm, ups, weight_used, po, receiving) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [_history_params(row_num, record) for row_num, record in numbered_records])
+
+    @staticmethod
+    def _history_record(row):
+        return {key: row[column] for column, key in HISTORY_FIELDS}
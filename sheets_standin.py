@@ -0,0 +1,425 @@
+"""
+Local stand-in for the Google Sheets v4 endpoints gspread uses, for load testing
+without spending real quota. Serves spreadsheet metadata, values get/batchGet,
+values append and batchUpdate (addSheet, deleteDimension, insertDimension,
+appendCells, updateCells; applied all-or-nothing) from in-memory sheets.
+
+Run it, then point the app at it:
+  python sheets_standin.py --port 8085 --history-rows 50000 --latency-ms 120 --jitter-ms 80 --error-rate 0.02
+  SHEETS_API_BASE_URL=http://127.0.0.1:8085 ITEMS_SHEET_ID=items VENDORS_SHEET_ID=vendors HISTORY_SHEET_ID=history python app.py
+
+GET /_stats returns request counts, response sizes, injected errors and the current row counts.
+"""
+import argparse
+import copy
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from gspread.utils import a1_range_to_grid_range, rowcol_to_a1
+
+from history_store import HISTORY_COLUMNS
+
+ITEMS_HEADER = ['Item', 'Weight']
+VENDORS_HEADER = ['Vendor Name', 'ZIP Code']
+
+_SPREADSHEET_PATH = re.compile(r'^/v4/spreadsheets/([^/:]+)(?::(batchUpdate)|/values:(batchGet)|/values/(.+?)(?::(append))?)?$')
+
+
+def _column_count(values):
+    return max([len(row) for row in values] + [1])
+
+
+def _trim(values):
+    """
+    Drop trailing empty cells and rows, as the Sheets API does in value responses.
+    """
+    rows = []
+    for row in values:
+        row = list(row)
+        while row and row[-1] in ('', None):
+            row.pop()
+        rows.append(row)
+    while rows and not rows[-1]:
+        rows.pop()
+    return rows
+
+
+def _cell_value(cell):
+    """
+    Plain value of a CellData's userEnteredValue ('' for an empty cell).
+    """
+    value = cell.get('userEnteredValue', {})
+    for kind in ('numberValue', 'stringValue', 'boolValue', 'formulaValue'):
+        if kind in value:
+            return value[kind]
+    return ''
+
+
+def _render(value, render_option):
+    if render_option in ('UNFORMATTED_VALUE', 'FORMULA'):
+        return value
+    return '' if value is None else str(value)
+
+
+class Sheet:
+    """
+    One spreadsheet. Its worksheets ("tabs") are held as lists of rows; the first
+    one, which the app reads, is also available as title and values.
+    """
+
+    def __init__(self, sheet_id, title, values):
+        self.id = sheet_id
+        self.tabs = [{'sheetId': 0, 'title': title, 'values': [list(row) for row in values]}]
+        self.lock = threading.Lock()
+
+    @property
+    def title(self):
+        return self.tabs[0]['title']
+
+    @property
+    def values(self):
+        return self.tabs[0]['values']
+
+    @values.setter
+    def values(self, values):
+        self.tabs[0]['values'] = values
+
+    def tab(self, title):
+        for tab in self.tabs:
+            if tab['title'] == title:
+                return tab
+        raise ValueError(f"Unable to parse range: {title}")
+
+    def metadata(self):
+        sheets = []
+        with self.lock:
+            for index, tab in enumerate(self.tabs):
+                rows, cols = max(len(tab['values']), 1000), max(_column_count(tab['values']), 26)
+                sheets.append({'properties': {
+                    'sheetId': tab['sheetId'], 'title': tab['title'], 'index': index, 'sheetType': 'GRID',
+                    'gridProperties': {'rowCount': rows, 'columnCount': cols},
+                }})
+        return {
+            'spreadsheetId': self.id,
+            'properties': {'title': self.id, 'locale': 'en_US', 'timeZone': 'America/New_York'},
+            'sheets': sheets,
+        }
+
+    def split_range(self, range_name):
+        """
+        Split 'Title!A1:B2' into the worksheet and the A1 part ('' for the whole sheet).
+        """
+        title, sep, cells = range_name.rpartition('!')
+        if not sep:
+            # A bare name is either a sheet title or an A1 range on the first sheet
+            name = range_name.strip("'").replace("''", "'")
+            if any(tab['title'] == name for tab in self.tabs):
+                return self.tab(name), ''
+            return self.tabs[0], range_name
+        return self.tab(title.strip("'").replace("''", "'")), cells
+
+    def get(self, range_name, render_option=None, major_dimension='ROWS'):
+        with self.lock:
+            tab, cells = self.split_range(range_name)
+            tab_values = tab['values']
+            if not cells:
+                values = _trim(tab_values)
+                start_row, start_col = 0, 0
+                end_row, end_col = len(values), _column_count(values)
+            else:
+                grid = a1_range_to_grid_range(cells)
+                start_row, end_row = grid.get('startRowIndex', 0), grid.get('endRowIndex', len(tab_values))
+                start_col = grid.get('startColumnIndex', 0)
+                end_col = grid.get('endColumnIndex', _column_count(tab_values))
+                values = _trim([row[start_col:end_col] for row in tab_values[start_row:end_row]])
+        values = [[_render(value, render_option) for value in row] for row in values]
+        if major_dimension == 'COLUMNS':
+            width = _column_count(values) if values else 0
+            values = _trim([[row[i] if i < len(row) else '' for row in values] for i in range(width)])
+        a1 = f"{rowcol_to_a1(start_row + 1, start_col + 1)}:{rowcol_to_a1(max(end_row, start_row + 1), max(end_col, start_col + 1))}"
+        response = {'range': f"{tab['title']}!{a1}", 'majorDimension': major_dimension}
+        if values:
+            response['values'] = values
+        return response
+
+    def append(self, range_name, values):
+        """
+        Append rows after the last non-empty row, like values.append with INSERT_ROWS.
+        """
+        rows = [list(row) for row in values]
+        with self.lock:
+            tab, _ = self.split_range(range_name)
+            tab['values'] = _trim(tab['values'])
+            start = len(tab['values']) + 1
+            tab['values'].extend(rows)
+        end = start + len(rows) - 1
+        cols = _column_count(rows)
+        updated = f"{tab['title']}!A{start}:{rowcol_to_a1(end, cols)}"
+        return {
+            'spreadsheetId': self.id,
+            'tableRange': f"{tab['title']}!A1:{rowcol_to_a1(max(start - 1, 1), cols)}",
+            'updates': {
+                'spreadsheetId': self.id, 'updatedRange': updated,
+                'updatedRows': len(rows), 'updatedColumns': cols,
+                'updatedCells': sum(len(row) for row in rows),
+            },
+        }
+
+    def batch_update(self, requests):
+        """
+        Apply the requests in order to a copy of the worksheets and keep the result only
+        if every request succeeds, as the API does.
+        """
+        replies = []
+        with self.lock:
+            tabs = copy.deepcopy(self.tabs)
+            for request in requests:
+                kind, body = next(iter(request.items()))
+                replies.append(self._apply(tabs, kind, body))
+            self.tabs = tabs
+        return {'spreadsheetId': self.id, 'replies': replies}
+
+    def _apply(self, tabs, kind, body):
+        if kind == 'addSheet':
+            properties = dict(body.get('properties', {}))
+            if any(tab['title'] == properties.get('title') for tab in tabs):
+                raise ValueError(f"A sheet with the name \"{properties.get('title')}\" already exists.")
+            properties.setdefault('sheetId', max(tab['sheetId'] for tab in tabs) + 1)
+            tabs.append({'sheetId': properties['sheetId'], 'title': properties['title'], 'values': []})
+            return {'addSheet': {'properties': properties}}
+        if kind in ('deleteDimension', 'insertDimension'):
+            span = body['range']
+            if span.get('dimension') != 'ROWS':
+                raise ValueError(f"Only ROWS {kind} is supported")
+            values = self._tab(tabs, span.get('sheetId', 0))['values']
+            if kind == 'deleteDimension':
+                del values[span['startIndex']:span['endIndex']]
+            else:
+                values[span['startIndex']:span['startIndex']] = [[] for _ in range(span['endIndex'] - span['startIndex'])]
+            return {}
+        if kind == 'appendCells':
+            tab = self._tab(tabs, body['sheetId'])
+            tab['values'] = _trim(tab['values'])
+            tab['values'].extend([_cell_value(cell) for cell in row.get('values', [])] for row in body.get('rows', []))
+            return {}
+        if kind == 'updateCells':
+            start = body['start']
+            values = self._tab(tabs, start.get('sheetId', 0))['values']
+            for offset, row in enumerate(body.get('rows', [])):
+                index = start.get('rowIndex', 0) + offset
+                while len(values) <= index:
+                    values.append([])
+                cells = values[index]
+                for column, cell in enumerate(row.get('values', []), start.get('columnIndex', 0)):
+                    while len(cells) <= column:
+                        cells.append('')
+                    cells[column] = _cell_value(cell)
+            return {}
+        raise ValueError(f"Unsupported request: {kind}")
+
+    @staticmethod
+    def _tab(tabs, sheet_id):
+        for tab in tabs:
+            if tab['sheetId'] == sheet_id:
+                return tab
+        raise ValueError(f"No grid with id: {sheet_id}")
+
+    def row_count(self):
+        with self.lock:
+            return len(self.values)
+
+
+def build_sheets(item_count=200, vendor_count=40, history_rows=5000, seed=0):
+    """
+    Synthetic items, vendors and history sheets of the requested sizes.
+    """
+    rnd = random.Random(seed)
+    items = [[f"Item {i:05d}", round(rnd.uniform(0.2, 40.0), 2)] for i in range(item_count)]
+    vendors = [[f"Vendor {i:03d}", f"{rnd.randint(1000, 99999):05d}"] for i in range(vendor_count)]
+    start = datetime(2023, 1, 1)
+    history = []
+    for i in range(history_rows):
+        name, weight = rnd.choice(items)
+        vendor = rnd.choice(vendors)[0]
+        quantity = rnd.randint(1, 50)
+        cost = round(rnd.uniform(0.1, 8.0), 4)
+        timestamp = (start + timedelta(minutes=17 * i)).strftime('%Y-%m-%d %H:%M:%S')
+        history.append([name, cost, round(cost * 1.1, 4), timestamp, quantity, vendor,
+                        rnd.choice(['Yes', 'No']), weight, f"PO{rnd.randint(10000, 99999)}", f"R{i}"])
+    return {
+        'items': Sheet('items', 'Sheet1', [ITEMS_HEADER] + items),
+        'vendors': Sheet('vendors', 'Sheet1', [VENDORS_HEADER] + vendors),
+        'history': Sheet('history', 'Sheet1', [HISTORY_COLUMNS] + history),
+    }
+
+
+class StandinServer(ThreadingHTTPServer):
+    """
+    HTTP server holding the sheets plus latency, error-injection and quota settings.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, sheets, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0,
+                 read_quota=0, write_quota=0, seed=None):
+        super().__init__(address, StandinHandler)
+        self.sheets = sheets
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.read_quota = read_quota  # requests per minute, 0 for no limit
+        self.write_quota = write_quota
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.windows = {'read': [], 'write': []}
+        self.stats = {'requests': {}, 'response_bytes': {}, 'injected_429': 0, 'quota_429': 0, 'errors': 0}
+
+    def count(self, endpoint, size=None):
+        with self.lock:
+            if size is None:
+                self.stats['requests'][endpoint] = self.stats['requests'].get(endpoint, 0) + 1
+            else:
+                self.stats['response_bytes'][endpoint] = self.stats['response_bytes'].get(endpoint, 0) + size
+
+    def throttle(self, kind):
+        """
+        Return True if this request should be answered with a 429.
+        """
+        with self.lock:
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.stats['injected_429'] += 1
+                return True
+            quota = self.read_quota if kind == 'read' else self.write_quota
+            if quota:
+                now = time.monotonic()
+                window = [t for t in self.windows[kind] if now - t < 60.0]
+                self.windows[kind] = window
+                if len(window) >= quota:
+                    self.stats['quota_429'] += 1
+                    return True
+                window.append(now)
+        return False
+
+    def delay(self):
+        with self.lock:
+            seconds = (self.latency_ms + self.random.uniform(0, self.jitter_ms)) / 1000.0
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def get_stats(self):
+        with self.lock:
+            stats = json.loads(json.dumps(self.stats))
+        stats['rows'] = {sheet_id: sheet.row_count() for sheet_id, sheet in self.sheets.items()}
+        return stats
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}') if length else {}
+        if url.path == '/_stats':
+            return self._send(200, self.server.get_stats())
+        match = _SPREADSHEET_PATH.match(url.path)
+        if match is None:
+            return self._error(404, 'NOT_FOUND', f"Unknown path {url.path}")
+        sheet_id, batch_update, batch_get, range_name, append = match.groups()
+        sheet = self.server.sheets.get(sheet_id)
+        if sheet is None:
+            return self._error(404, 'NOT_FOUND', 'Requested entity was not found.')
+        if method == 'POST' and batch_update:
+            endpoint, kind = 'batchUpdate', 'write'
+        elif method == 'POST' and append:
+            endpoint, kind = 'append', 'write'
+        elif method == 'GET' and batch_get:
+            endpoint, kind = 'batchGet', 'read'
+        elif method == 'GET' and range_name:
+            endpoint, kind = 'values', 'read'
+        elif method == 'GET' and not (batch_update or batch_get or range_name):
+            endpoint, kind = 'metadata', 'read'
+        else:
+            return self._error(404, 'NOT_FOUND', f"Unsupported {method} {url.path}")
+        self.server.count(endpoint)
+        self.server.delay()
+        if self.server.throttle(kind):
+            return self._error(429, 'RESOURCE_EXHAUSTED',
+                               f"Quota exceeded for quota metric '{kind.title()} requests' and limit "
+                               f"'{kind.title()} requests per minute per user'")
+        render = params.get('valueRenderOption', [None])[0]
+        dimension = params.get('majorDimension', ['ROWS'])[0]
+        try:
+            if endpoint == 'metadata':
+                response = sheet.metadata()
+            elif endpoint == 'values':
+                response = sheet.get(unquote(range_name), render, dimension)
+            elif endpoint == 'batchGet':
+                response = {'spreadsheetId': sheet_id,
+                            'valueRanges': [sheet.get(r, render, dimension) for r in params.get('ranges', [])]}
+            elif endpoint == 'append':
+                response = sheet.append(unquote(range_name), body.get('values', []))
+            else:
+                response = sheet.batch_update(body.get('requests', []))
+        except (ValueError, KeyError) as e:
+            with self.server.lock:
+                self.server.stats['errors'] += 1
+            return self._error(400, 'INVALID_ARGUMENT', str(e))
+        self.server.count(endpoint, self._send(200, response))
+
+    def _error(self, code, status, message):
+        self._send(code, {'error': {'code': code, 'message': message, 'status': status}})
+
+    def _send(self, code, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        return len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8085)
+    parser.add_argument('--items', type=int, default=200, help='rows in the items sheet')
+    parser.add_argument('--vendors', type=int, default=40, help='rows in the vendors sheet')
+    parser.add_argument('--history-rows', type=int, default=5000, help='rows in the shipping history sheet')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='fixed delay added to every API call')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='extra uniform random delay per call')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='probability of answering with a 429')
+    parser.add_argument('--read-quota', type=int, default=0, help='read requests per minute before 429s (0 = unlimited)')
+    parser.add_argument('--write-quota', type=int, default=0, help='write requests per minute before 429s (0 = unlimited)')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for the data and the injected latency/errors')
+    args = parser.parse_args()
+
+    sheets = build_sheets(args.items, args.vendors, args.history_rows, args.seed)
+    server = StandinServer((args.host, args.port), sheets, args.latency_ms, args.jitter_ms, args.error_rate,
+                           args.read_quota, args.write_quota, args.seed)
+    print(f"Sheets stand-in on http://{args.host}:{args.port} "
+          f"(items, vendors, history: {args.items}, {args.vendors}, {args.history_rows} rows)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,346 @@
+"""
+Storage backends for items, vendors and shipping history.
+The app talks to one backend chosen by the STORAGE_BACKEND environment variable:
+  sheets  - Google Sheets via google_sheets.py (default, the system of record)
+  sqlite  - a local SQLite file (STORAGE_SQLITE_PATH), same schema as the sheets mirror
+  memory  - in-process only, optionally seeded from a SQLite file (STORAGE_SEED_SQLITE)
+The local backends make no network calls, so the API can be benchmarked and load-tested.
+"""
+import os
+import threading
+from abc import ABC, abstractmethod
+
+import google_sheets
+from history_store import HISTORY_COLUMNS, HistoryStore, history_record_from_row
+from sheets_mirror import SheetsMirror, normalize
+
+
+class StorageBackend(ABC):
+    """
+    Interface every backend implements. History rows are lists in HISTORY_COLUMNS
+    order, as built by google_sheets.build_shipping_history_row.
+    start, is_ready and get_stats have defaults; everything else must be overridden.
+    """
+    name = None
+
+    def start(self):
+        """
+        Start any background work (called once at app startup).
+        """
+
+    def is_ready(self):
+        """
+        True once startup work needed for steady-state latency (e.g. cache warm-up) is done.
+        """
+        return True
+
+    @abstractmethod
+    def get_item_names(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_item_weight(self, item_name):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_items_with_weights(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_item(self, name, weight):
+        """
+        Add an item; raises ValueError if it already exists.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def remove_item(self, name):
+        """
+        Remove an item; returns False if it was not found.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_vendors(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_vendor(self, name, zip_code):
+        """
+        Add a vendor; raises ValueError if the same name and ZIP already exist.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_history_rows(self, rows):
+        """
+        Persist history rows; returns True once they are safely stored.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_item_shipping_averages(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_item_history(self, item_name, vendor=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_last_weight_used(self, item_name, vendor=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_item_names_by_vendor(self, vendor):
+        raise NotImplementedError
+
+    def get_stats(self):
+        return {"backend": self.name}
+
+
+class SheetsBackend(StorageBackend):
+    """
+    Google Sheets, with history written behind the request through the spool.
+    """
+    name = 'sheets'
+
+    def start(self):
+        # Start the write-behind history writer now so rows spooled before a restart are replayed
+        if google_sheets.get_history_writer() is None:
+            print("Warning: HISTORY_SPOOL_PATH is not set; shipping history is written synchronously")
+        # Keep the local SQLite mirror fresh in the background (only when SHEETS_MIRROR_PATH is set)
+        google_sheets.start_mirror_sync()
+        # Load the sheet caches in parallel now rather than on the first page load
+        google_sheets.start_warmup()
+        # Move old history rows to archive worksheets (only when HISTORY_ARCHIVE_AFTER_DAYS is set)
+        google_sheets.start_history_archival()
+
+    def is_ready(self):
+        return google_sheets.is_ready()
+
+    def get_item_names(self):
+        return google_sheets.get_item_names()
+
+    def get_item_weight(self, item_name):
+        return google_sheets.get_item_weight(item_name)
+
+    def get_items_with_weights(self):
+        return google_sheets.get_items_with_weights()
+
+    def add_item(self, name, weight):
+        return google_sheets.add_item_to_sheet(name, weight)
+
+    def remove_item(self, name):
+        return google_sheets.remove_item_from_sheet(name)
+
+    def get_vendors(self):
+        return google_sheets.get_vendors_data()
+
+    def add_vendor(self, name, zip_code):
+        return google_sheets.add_vendor_to_sheet(name, zip_code)
+
+    def save_history_rows(self, rows):
+        return google_sheets.enqueue_shipping_history_rows(rows)
+
+    def get_item_shipping_averages(self):
+        return google_sheets.get_item_shipping_averages()
+
+    def delete_item_history(self, item_name, vendor=None):
+        return google_sheets.delete_item_shipping_history(item_name, vendor)
+
+    def get_last_weight_used(self, item_name, vendor=None):
+        return google_sheets.get_last_weight_used(item_name, vendor)
+
+    def get_item_names_by_vendor(self, vendor):
+        return google_sheets.get_item_names_by_vendor(vendor)
+
+    def get_stats(self):
+        return {"backend": self.name, "client": google_sheets.get_client_stats(), "caches": google_sheets.get_cache_stats()}
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    A local SQLite file as the primary store, using the sheets mirror schema
+    (so a synced SHEETS_MIRROR_PATH file can be copied in as test data).
+    """
+    name = 'sqlite'
+
+    def __init__(self, path):
+        self.db = SheetsMirror(path)
+        self._lock = threading.Lock()
+
+    def get_item_names(self):
+        return [item['Item'] for item in self.db.items() if item['Item']]
+
+    def get_item_weight(self, item_name):
+        weight = self.db.item_weight(item_name)
+        return None if weight is None else float(weight)
+
+    def get_items_with_weights(self):
+        return [{"name": item["Item"], "weight": item["Weight"]} for item in self.db.items() if item["Item"]]
+
+    def add_item(self, name, weight):
+        with self._lock:
+            if self.db.has_item(name):
+                raise ValueError("Item already exists")
+            self.db.add_item(name, google_sheets.sheet_value(weight))
+        return True
+
+    def remove_item(self, name):
+        return self.db.remove_item(name)
+
+    def get_vendors(self):
+        return self.db.vendors()
+
+    def add_vendor(self, name, zip_code):
+        with self._lock:
+            if self.db.has_vendor(name, zip_code):
+                raise ValueError("Vendor with this ZIP already exists.")
+            self.db.add_vendor(name, zip_code)
+        return True
+
+    def save_history_rows(self, rows):
+        self.db.add_history([record for record in map(history_record_from_row, rows) if record is not None])
+        return True
+
+    def get_item_shipping_averages(self):
+        return self.db.averages()
+
+    def delete_item_history(self, item_name, vendor=None):
+        self.db.delete_history(item_name, vendor)
+        return True
+
+    def get_last_weight_used(self, item_name, vendor=None):
+        return self.db.last_weight_used(item_name, vendor)
+
+    def get_item_names_by_vendor(self, vendor):
+        return self.db.item_names_by_vendor(vendor)
+
+    def get_stats(self):
+        return {"backend": self.name, "path": self.db.path, "history_rows": self.db.history_count()}
+
+
+class MemoryBackend(StorageBackend):
+    """
+    Everything in process memory; history lives in a HistoryStore like the sheets cache.
+    """
+    name = 'memory'
+
+    def __init__(self, seed_path=None):
+        self._lock = threading.RLock()
+        self.items = []
+        self.weights = {}
+        self.vendors = []
+        self.history = HistoryStore()
+        self.history.load([HISTORY_COLUMNS])
+        if seed_path:
+            seed = SheetsMirror(seed_path)
+            self.items = seed.items()
+            self.vendors = seed.vendors()
+            self.history.extend([[record[column] for column in HISTORY_COLUMNS] for record in seed.history()])
+        self._index_items()
+
+    def _index_items(self):
+        """
+        Rebuild the normalized name -> weight index (first row wins, as in the sheet).
+        """
+        self.weights = {}
+        for item in self.items:
+            self.weights.setdefault(normalize(item['Item']), item['Weight'])
+
+    def get_item_names(self):
+        with self._lock:
+            return [item['Item'] for item in self.items if item['Item']]
+
+    def get_item_weight(self, item_name):
+        with self._lock:
+            weight = self.weights.get(normalize(item_name))
+        return None if weight is None else float(weight)
+
+    def get_items_with_weights(self):
+        with self._lock:
+            return [{"name": item["Item"], "weight": item["Weight"]} for item in self.items if item["Item"]]
+
+    def add_item(self, name, weight):
+        with self._lock:
+            if normalize(name) in self.weights:
+                raise ValueError("Item already exists")
+            self.items.append({'Item': name, 'Weight': google_sheets.sheet_value(weight)})
+            self._index_items()
+        return True
+
+    def remove_item(self, name):
+        key = normalize(name)
+        with self._lock:
+            for i, item in enumerate(self.items):
+                if normalize(item['Item']) == key:
+                    del self.items[i]
+                    self._index_items()
+                    return True
+        return False
+
+    def get_vendors(self):
+        with self._lock:
+            return list(self.vendors)
+
+    def add_vendor(self, name, zip_code):
+        with self._lock:
+            for vendor in self.vendors:
+                if normalize(vendor['vendor']) == normalize(name) and str(vendor['zip']).strip() == str(zip_code).strip():
+                    raise ValueError("Vendor with this ZIP already exists.")
+            self.vendors.append({'vendor': name, 'zip': str(zip_code)})
+        return True
+
+    def save_history_rows(self, rows):
+        with self._lock:
+            self.history.extend(rows)
+        return True
+
+    def get_item_shipping_averages(self):
+        with self._lock:
+            return self.history.averages()
+
+    def delete_item_history(self, item_name, vendor=None):
+        with self._lock:
+            row_numbers = [
+                row_number for row_number, record in self.history.numbered_records()
+                if normalize(record.item_name) == normalize(item_name)
+                and (vendor is None or normalize(record.vendor) == normalize(vendor))
+            ]
+            self.history.delete(row_numbers)
+        return True
+
+    def get_last_weight_used(self, item_name, vendor=None):
+        with self._lock:
+            return self.history.last_weight(item_name, vendor)
+
+    def get_item_names_by_vendor(self, vendor):
+        with self._lock:
+            return self.history.item_names_by_vendor(vendor)
+
+    def get_stats(self):
+        with self._lock:
+            return {"backend": self.name, "items": len(self.items), "vendors": len(self.vendors), "history_rows": len(self.history)}
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """
+    Return the process-wide storage backend selected by STORAGE_BACKEND.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            kind = os.environ.get('STORAGE_BACKEND', 'sheets').strip().lower()
+            if kind == 'sheets':
+                _backend = SheetsBackend()
+            elif kind == 'sqlite':
+                _backend = SQLiteBackend(os.environ.get('STORAGE_SQLITE_PATH', 'gameday_shipping.sqlite3'))
+            elif kind == 'memory':
+                _backend = MemoryBackend(os.environ.get('STORAGE_SEED_SQLITE'))
+            else:
+                raise ValueError(f"Unknown STORAGE_BACKEND '{kind}' (expected sheets, sqlite or memory)")
+        return _backend
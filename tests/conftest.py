@@ -0,0 +1,50 @@
+"""
+Shared fixtures. google_sheets reads its settings at import, so the sheets_standin
+server is started and the environment pointed at it before any test imports it.
+"""
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sheets_standin  # noqa: E402
+
+_server = sheets_standin.StandinServer(('127.0.0.1', 0), {})
+threading.Thread(target=_server.serve_forever, daemon=True).start()
+
+for name in ('HISTORY_SPOOL_PATH', 'SHEETS_MIRROR_PATH', 'HISTORY_ARCHIVE_AFTER_DAYS'):
+    os.environ.pop(name, None)
+os.environ.update({
+    'SHEETS_API_BASE_URL': f'http://127.0.0.1:{_server.server_address[1]}',
+    'ITEMS_SHEET_ID': 'items',
+    'VENDORS_SHEET_ID': 'vendors',
+    'HISTORY_SHEET_ID': 'history',
+    'SHEETS_READ_QUOTA_PER_MINUTE': '100000',
+    'SHEETS_WRITE_QUOTA_PER_MINUTE': '100000',
+    'SHEETS_RATE_BURST': '1000',
+})
+
+import google_sheets  # noqa: E402
+from history_store import HistoryStore  # noqa: E402
+
+
+@pytest.fixture
+def sheets():
+    """
+    Fresh stand-in sheets (small items/vendors lists, 300 history rows) and a
+    google_sheets with empty caches and history store.
+    """
+    _server.sheets.clear()
+    _server.sheets.update(sheets_standin.build_sheets(item_count=20, vendor_count=4, history_rows=300, seed=7))
+    google_sheets.invalidate_worksheet()
+    google_sheets.invalidate_items_cache()
+    with google_sheets._vendors_cache_lock:
+        google_sheets._vendors_cache['vendors'] = None
+        google_sheets._vendors_cache['version'] += 1
+    with google_sheets._history_write_lock, google_sheets._history_lock:
+        google_sheets._history_store = HistoryStore()
+        google_sheets._history_stats.update(full_syncs=0, tail_syncs=0, rows_ingested=0, synced_at=None)
+    return _server.sheets
@@ -0,0 +1,47 @@
+import google_sheets
+from history_store import HistoryStore
+
+
+def _lookups():
+    names = sorted(set(record['Item Name'] for record in google_sheets.get_shipping_history()))
+    vendors = ['Vendor 000', 'Vendor 001', 'Vendor 002', 'Vendor 003']
+    averages = sorted((str(a['name']), a['vendor'], round(a['avg_per_unit_shipping_offset'], 9), a['UPS'])
+                      for a in google_sheets.get_item_shipping_averages())
+    last_weights = [google_sheets.get_last_weight_used(name, vendor) for name in names for vendor in [None] + vendors]
+    names_by_vendor = [google_sheets.get_item_names_by_vendor(vendor) for vendor in vendors]
+    return averages, last_weights, names_by_vendor
+
+
+def _archived_and_live_rows(sheets):
+    tabs = sheets['history'].tabs
+    archived = [row for tab in tabs[1:] for row in tab['values'][1:]]
+    live = [row for row in sheets['history'].values[1:] if row[8] != google_sheets.ARCHIVE_SUMMARY_PO]
+    return archived + live
+
+
+def test_archive_keeps_lookups(sheets):
+    original = sorted(map(tuple, sheets['history'].values[1:]), key=lambda row: row[9])
+    before = _lookups()
+    # History starts 2023-01-01 with a row every 17 minutes; archive in stages, re-archiving summaries
+    for cutoff in ['2023-01-02', '2023-01-03 12:00:00', '2023-01-03 12:00:00', '2023-01-04']:
+        result = google_sheets.archive_shipping_history(cutoff)
+        assert result is not None
+        assert _lookups() == before
+    assert sorted(map(tuple, _archived_and_live_rows(sheets)), key=lambda row: row[9]) == original
+    assert [tab['title'] for tab in sheets['history'].tabs] == ['Sheet1', 'History Archive 2023']
+
+
+def test_capped_archive_runs_keep_lookups(sheets):
+    before = _lookups()
+    result = google_sheets.archive_shipping_history('2023-01-03', max_rows=40)
+    runs = 1
+    while result['rows_remaining']:
+        assert result['rows_archived'] == 40
+        assert _lookups() == before
+        result = google_sheets.archive_shipping_history('2023-01-03', max_rows=40)
+        runs += 1
+    assert runs > 1
+    assert _lookups() == before
+    store = HistoryStore()
+    store.load(sheets['history'].values)
+    assert all(record.po == google_sheets.ARCHIVE_SUMMARY_PO for record in store.records_between(end='2023-01-03'))
@@ -0,0 +1,63 @@
+import random
+
+from history_store import HISTORY_COLUMNS, HistoryStore
+
+
+def _rows(count, seed):
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(count):
+        rows.append([
+            rnd.choice(['Hat', 'Cap', 'cap ', '12', '']),
+            rnd.choice(['1.5', '2', 'x', '']),
+            rnd.choice(['2.25', '3', 'n/a', '']),
+            rnd.choice([f'2025-0{rnd.randrange(1, 10)}-1{rnd.randrange(10)} 10:00:00', '2025-01-02T08:00:00', 'junk', '']),
+            rnd.choice(['1', '4', '', 'q']),
+            rnd.choice(['V1', 'v1 ', 'V2', '']),
+            rnd.choice(['Yes', 'No']),
+            rnd.choice(['1.5', '7', 'N/A', '']),
+            f'PO{i}',
+            rnd.choice(['Dock', '']),
+        ])
+    return rows
+
+
+def _state(store):
+    return {
+        'records': [(row_number, dict(record)) for row_number, record in store.numbered_records()],
+        'averages': sorted((str(a['name']), a['vendor'], round(a['avg_per_unit_shipping_offset'], 9), a['UPS'])
+                           for a in store.averages()),
+        'last_weights': store.last_weights,
+        'vendor_items': {vendor: entry['names'] for vendor, entry in store.vendor_items.items()},
+        'by_time': [dict(record) for record in store.records_between()],
+        'last_row_number': store.last_row_number,
+    }
+
+
+def test_delete_matches_fresh_load():
+    for seed in range(40):
+        rows = _rows(random.Random(seed).randrange(1, 60), seed)
+        store = HistoryStore()
+        store.load([HISTORY_COLUMNS] + rows)
+        deleted = set(random.Random(seed).sample(range(2, len(rows) + 2), min(6, len(rows))))
+        store.delete(deleted)
+        fresh = HistoryStore()
+        fresh.load([HISTORY_COLUMNS] + [row for i, row in enumerate(rows) if i + 2 not in deleted])
+        assert _state(store) == _state(fresh), seed
+
+
+def test_extend_matches_fresh_load():
+    rows = _rows(80, 1)
+    store = HistoryStore()
+    store.load([HISTORY_COLUMNS] + rows[:30])
+    store.extend(rows[30:])
+    fresh = HistoryStore()
+    fresh.load([HISTORY_COLUMNS] + rows)
+    assert _state(store) == _state(fresh)
+
+
+def test_timestamp_text_round_trips():
+    rows = _rows(60, 2)
+    store = HistoryStore()
+    store.load([HISTORY_COLUMNS] + rows)
+    assert [record.timestamp for _, record in store.numbered_records()] == [row[3] for row in rows if row[0]]
@@ -0,0 +1,66 @@
+import google_sheets
+from history_store import HistoryStore
+
+
+def _sheet_state():
+    """
+    A store loaded from a fresh read of the history sheet, as a full resync would build it.
+    """
+    store = HistoryStore()
+    store.load(google_sheets._with_worksheet('history', lambda sheet: sheet.get_all_values()))
+    return _store_state(store)
+
+
+def _store_state(store):
+    return (
+        [(row_number, dict(record)) for row_number, record in store.numbered_records()],
+        sorted((str(a['name']), a['vendor'], round(a['avg_per_unit_shipping_offset'], 9), a['UPS']) for a in store.averages()),
+        store.last_weights,
+    )
+
+
+def _sync():
+    google_sheets._refresh_history('history')
+    return dict(google_sheets._history_stats)
+
+
+def test_external_append_is_a_tail_sync(sheets):
+    before = _sync()
+    assert before['full_syncs'] == 1
+    sheets['history'].append('A1', [['Outside', 1, 1.1, '2025-06-01 10:00:00', 2, 'Vendor 000', 'Yes', 3, 'PO1', '']])
+    after = _sync()
+    assert after['tail_syncs'] == before['tail_syncs'] + 1
+    assert after['full_syncs'] == before['full_syncs']
+    assert _store_state(google_sheets._history_store) == _sheet_state()
+
+
+def test_external_delete_forces_full_resync(sheets):
+    before = _sync()
+    del sheets['history'].values[10:15]
+    after = _sync()
+    assert after['full_syncs'] == before['full_syncs'] + 1
+    assert _store_state(google_sheets._history_store) == _sheet_state()
+
+
+def test_external_edit_of_last_row_forces_full_resync(sheets):
+    before = _sync()
+    sheets['history'].values[-1][0] = 'Renamed'
+    after = _sync()
+    assert after['full_syncs'] == before['full_syncs'] + 1
+    assert _store_state(google_sheets._history_store) == _sheet_state()
+
+
+def test_own_append_after_external_one_syncs_on_next_read(sheets):
+    _sync()
+    sheets['history'].append('A1', [['Outside', 1, 1.1, '2025-06-01 10:00:00', 2, 'Vendor 000', 'Yes', 3, 'PO1', '']])
+    assert google_sheets.save_shipping_history('Mine', 1, 1, 1, 'Vendor 001')
+    names = [record['Item Name'] for record in google_sheets.get_shipping_history()]
+    assert names[-2:] == ['Outside', 'Mine']
+
+
+def test_delete_item_history_matches_fresh_load(sheets):
+    _sync()
+    name = sheets['history'].values[1][0]
+    assert google_sheets.delete_item_shipping_history(name.lower())
+    assert all(row[0] != name for row in sheets['history'].values)
+    assert _store_state(google_sheets._history_store) == _sheet_state()
@@ -0,0 +1,84 @@
+import json
+import time
+
+from history_writer import HistoryWriter
+
+
+class _Rejected(Exception):
+    pass
+
+
+def _wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_spool_is_replayed_on_start(tmp_path):
+    spool = str(tmp_path / 'spool.jsonl')
+    # Rows enqueued by a writer that never got to flush them (e.g. the process died)
+    assert HistoryWriter(lambda rows: True, spool).enqueue([['A', 1], ['B', 2]])
+
+    flushed = []
+    writer = HistoryWriter(lambda rows: flushed.extend(rows) or True, spool, linger=0.01)
+    writer.start()
+    assert _wait_for(lambda: writer.get_stats()['pending'] == 0)
+    assert flushed == [['A', 1], ['B', 2]]
+    assert writer.get_stats()['replayed'] == 2
+    assert not (tmp_path / 'spool.jsonl').exists()
+
+
+def test_rejected_batch_is_dead_lettered(tmp_path):
+    spool = str(tmp_path / 'spool.jsonl')
+    flushed = []
+
+    def flush(rows):
+        if any(row[0] == 'bad' for row in rows):
+            raise _Rejected('400 bad row')
+        flushed.extend(rows)
+        return True
+
+    writer = HistoryWriter(flush, spool, batch_size=2, linger=0.01, max_backoff=0.05,
+                           is_permanent=lambda e: isinstance(e, _Rejected), max_permanent_failures=2)
+    writer.enqueue([['bad'], ['a']])
+    writer.enqueue([['b'], ['c']])
+    writer.start()
+    assert _wait_for(lambda: writer.get_stats()['pending'] == 0)
+    assert flushed == [['b'], ['c']]
+    assert writer.get_stats()['dead_lettered'] == 2
+    with open(spool + '.dead') as f:
+        dead = [json.loads(line) for line in f]
+    assert [entry['row'] for entry in dead] == [['bad'], ['a']]
+    assert dead[0]['error'] == '400 bad row'
+
+
+def test_other_failures_are_retried(tmp_path):
+    spool = str(tmp_path / 'spool.jsonl')
+    attempts = []
+
+    def flush(rows):
+        attempts.append(rows)
+        if len(attempts) < 3:
+            raise OSError('connection reset')
+        return True
+
+    writer = HistoryWriter(flush, spool, linger=0.01, max_backoff=0.05,
+                           is_permanent=lambda e: isinstance(e, _Rejected), max_permanent_failures=1)
+    writer.enqueue([['a']])
+    writer.start()
+    assert _wait_for(lambda: writer.get_stats()['pending'] == 0)
+    assert len(attempts) == 3
+    assert writer.get_stats()['dead_lettered'] == 0
+
+
+def test_discard_drops_queued_rows_from_spool(tmp_path):
+    spool = str(tmp_path / 'spool.jsonl')
+    writer = HistoryWriter(lambda rows: True, spool)
+    writer.enqueue([['Zed', 'V1'], ['Keep', 'V1'], ['Zed', 'V2']])
+    assert writer.discard(lambda row: row[0] == 'Zed') == 2
+    assert writer.pending_rows() == [['Keep', 'V1']]
+    replayed = HistoryWriter(lambda rows: True, spool)
+    assert [row for _, row in replayed._read_spool()] == [['Keep', 'V1']]